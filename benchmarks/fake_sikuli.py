@@ -0,0 +1,124 @@
+"""Stand-in for the SikuliLibrary Java server, for benchmarks on machines without a desktop.
+
+Speaks the same XML-RPC remote library protocol, including
+``system.multicall``, and answers the primitives the vision keywords send.
+Images are "on screen" unless their file name contains one of ``hidden``.
+Primitives named in ``rejected`` always fail, as the server does on bad input.
+Every round trip sleeps ``latency`` seconds and every primitive
+``primitive_time`` more, to model the network hop and the Java side.
+"""
+
+from __future__ import annotations
+
+import socketserver
+import threading
+import time
+from collections import Counter
+from pathlib import PurePath
+from typing import Iterable, Optional
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the Java server.
+
+    def do_POST(self) -> None:
+        self.server.owner._round_trip()
+        super().do_POST()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+class FakeSikuliServer:
+    REGION = [100, 100, 80, 40]
+    SCREEN = [0, 0, 1920, 1080]
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        primitive_time: float = 0.0,
+        hidden: Iterable[str] = ("missing",),
+        multicall: bool = True,
+        rejected: Iterable[str] = (),
+    ) -> None:
+        self.latency = latency
+        self.primitive_time = primitive_time
+        self.hidden = tuple(hidden)
+        self.rejected = frozenset(rejected)
+        self.round_trips = 0
+        self.primitives: Counter = Counter()
+        self._lock = threading.Lock()
+
+        self._server = _Server(("127.0.0.1", 0), requestHandler=_Handler, allow_none=True, logRequests=False)
+        self._server.owner = self
+        self._server.register_function(self.run_keyword)
+        self._server.register_function(lambda: [], "get_keyword_names")
+        if multicall:
+            self._server.register_multicall_functions()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> FakeSikuliServer:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.round_trips = 0
+            self.primitives.clear()
+
+    def visible(self, image: str) -> bool:
+        name = PurePath(str(image).replace("\\", "/")).name
+        return not any(hidden in name for hidden in self.hidden)
+
+    def run_keyword(self, name: str, args: list, kwargs: Optional[dict] = None) -> dict:
+        with self._lock:
+            self.primitives[name] += 1
+        if self.primitive_time:
+            time.sleep(self.primitive_time)
+
+        if name in self.rejected:
+            return self._fail(f"{name} rejected {args}")
+        if name == "Highlight Region":
+            time.sleep(float(args[1]))  # Blocks for its duration, like the Java side.
+            return self._pass(None)
+        if name in ("Wait Until Screen Contain", "Get Image Coordinates", "Highlight"):
+            if not self.visible(args[0]):
+                return self._fail(f"Image '{args[0]}' is not on the screen")
+            return self._pass(list(self.REGION) if name == "Get Image Coordinates" else None)
+        if name == "Exists":
+            return self._pass(self.visible(args[0]))
+        if name == "Image Count":
+            return self._pass(2 if self.visible(args[0]) else 0)
+        if name == "Get Number Of Screens":
+            return self._pass(1)
+        if name == "Get Screen Coordinates":
+            return self._pass(list(self.SCREEN))
+        return self._pass(None)
+
+    def _round_trip(self) -> None:
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _pass(value) -> dict:
+        return {"status": "PASS", "return": "" if value is None else value, "output": ""}
+
+    @staticmethod
+    def _fail(error: str) -> dict:
+        return {"status": "FAIL", "error": error, "output": ""}
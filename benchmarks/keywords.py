@@ -0,0 +1,180 @@
+"""Latency, RPC round trips and throughput of the vision keywords, without a desktop.
+
+The Sikuli engine keywords run through the library against the stand-in
+server of ``fake_sikuli.py``, with ``--latency`` seconds per round trip.
+The native matcher runs in-process on recorded screenshots, by default
+``dashboard.png``, where every component matches, and ``dashboard_2.jpg``,
+where none does and every search scans the whole frame.
+
+Run from the repository root after ``pip install -e .[native]``::
+
+    python benchmarks/keywords.py --latency 0.002 --iterations 50
+    python benchmarks/keywords.py --json results.json  # Keep for comparing runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fake_sikuli import FakeSikuliServer
+from SikuliPlusLibrary import SikuliPlusLibrary
+
+IMAGES = Path(__file__).resolve().parent.parent / "tests" / "robot" / "images"
+COMPONENTS = IMAGES / "dashboard" / "components"
+SCREENSHOTS = [IMAGES / "dashboard" / "dashboard.png", IMAGES / "dashboard_2.jpg"]
+
+VISITS_CARD = str(COMPONENTS / "visits_card.png")
+VISITS_TODAY = str(COMPONENTS / "visits_today.png")
+TOTAL_ARTICLES = str(COMPONENTS / "total_articles.png")
+MISSING = str(COMPONENTS / "missing.png")
+
+# (label, keyword, positional arguments, named arguments)
+KEYWORD_SCENARIOS = [
+    ("Wait For Image", "Wait For Image", [VISITS_TODAY], {}),
+    ("Wait For Image similarity", "Wait For Image", [VISITS_TODAY], {"similarity": 0.9}),
+    ("Wait For Image roi list", "Wait For Image", [VISITS_TODAY], {"roi": [0, 0, 500, 300]}),
+    ("Wait For Image roi image", "Wait For Image", [VISITS_TODAY], {"roi": VISITS_CARD}),
+    ("Wait For Image roi anchor", "Wait For Image", [VISITS_TODAY], {"roi": "card"}),
+    ("Wait For Any Image", "Wait For Any Image", [MISSING, VISITS_TODAY], {"timeout": 5}),
+    ("Wait For All Images", "Wait For All Images", [VISITS_CARD, VISITS_TODAY], {"timeout": 5}),
+    ("Count Image", "Count Image", [VISITS_TODAY], {}),
+    ("Count Multiple Images", "Count Multiple Images", [VISITS_TODAY, TOTAL_ARTICLES], {}),
+]
+
+
+def percentile(durations: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted ``durations``."""
+    rank = max(math.ceil(percent / 100 * len(durations)), 1)
+    return durations[rank - 1]
+
+
+def measure(function: Callable[[], object], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        function()
+
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+
+    durations.sort()
+    return {
+        "calls": iterations,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p90_ms": percentile(durations, 90) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "max_ms": durations[-1] * 1000,
+        "calls_per_s": iterations / sum(durations),
+    }
+
+
+def bench_keywords(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    server = FakeSikuliServer(args.latency, args.primitive_time, multicall=not args.no_multicall).start()
+    # keep_server connects to whatever already listens on server_port, here the stand-in.
+    library = SikuliPlusLibrary(
+        engine="sikuli", highlight=args.highlight, server_port=server.port, keep_server=True
+    )
+    library.run_keyword("Register Anchor", ["card", VISITS_CARD], {})
+
+    results = {}
+    try:
+        for label, name, positional, named in KEYWORD_SCENARIOS:
+            run = lambda: library.run_keyword(name, list(positional), dict(named))
+            run()  # Warm up outside the counters.
+            library.rpc.flush()
+            server.reset_counters()
+
+            result = measure(run, args.iterations, warmup=0)
+            library.rpc.flush()
+            result["round_trips"] = server.round_trips / args.iterations
+            result["primitives"] = sum(server.primitives.values()) / args.iterations
+            results[label] = result
+    finally:
+        library.close()
+        server.stop()
+    return results
+
+
+def bench_matcher(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    from SikuliPlusLibrary.native.capture import Frame
+    from SikuliPlusLibrary.native.engine import NativeEngine
+    from SikuliPlusLibrary.native.templates import TemplateCache
+
+    templates = TemplateCache()
+    components = sorted(str(path) for path in COMPONENTS.glob("*.png"))
+    results = {}
+    for screenshot in args.screenshots:
+        pixels = templates.get(str(screenshot)).gray
+
+        def frame() -> Frame:
+            # A new frame per call, as from a capture, so nothing cached on the last one is reused.
+            return Frame(pixels)
+
+        options = {"pyramid_levels": args.pyramid_levels, "workers": args.workers, "scales": args.scales}
+        engine = NativeEngine(templates=templates, location_hints=False, **options)
+        hinted = NativeEngine(templates=templates, **options)
+        operations = {
+            "search": lambda: engine.search(frame(), VISITS_TODAY, args.similarity),
+            "search hinted": lambda: hinted.search(frame(), VISITS_TODAY, args.similarity),
+            f"search_screens x{len(components)}": lambda: engine.search_screens(
+                [(frame(), None)], components, args.similarity
+            ),
+            "search_all": lambda: engine.search_all(frame(), VISITS_TODAY, args.similarity),
+        }
+        for operation, function in operations.items():
+            results[f"{Path(screenshot).name} {operation}"] = measure(function, args.iterations)
+        engine.close()
+        hinted.close()
+    return results
+
+
+def report(title: str, results: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'':<40} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'calls/s':>9} {'trips':>6} {'prims':>6}")
+    for label, result in results.items():
+        trips = f"{result['round_trips']:.1f}" if "round_trips" in result else "-"
+        primitives = f"{result['primitives']:.1f}" if "primitives" in result else "-"
+        print(
+            f"{label:<40} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{result['max_ms']:>8.2f} {result['calls_per_s']:>9.1f} {trips:>6} {primitives:>6}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.001, help="seconds per RPC round trip")
+    parser.add_argument("--primitive-time", type=float, default=0.0, help="seconds per Sikuli primitive")
+    parser.add_argument("--no-multicall", action="store_true", help="serve without system.multicall")
+    parser.add_argument("--highlight", action="store_true", help="draw highlights, as by default in robot")
+    parser.add_argument("--screenshots", type=Path, nargs="*", default=SCREENSHOTS)
+    parser.add_argument("--similarity", type=float, default=0.7)
+    parser.add_argument("--pyramid-levels", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0], help="template scales to match at")
+    parser.add_argument("--skip-keywords", action="store_true")
+    parser.add_argument("--skip-matcher", action="store_true")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    if not args.skip_keywords:
+        results["keywords"] = bench_keywords(args)
+        report(f"Sikuli engine keywords, {args.latency * 1000:g} ms per round trip", results["keywords"])
+    if not args.skip_matcher and args.screenshots:
+        results["matcher"] = bench_matcher(args)
+        report(f"Native matcher, {args.workers} workers", results["matcher"])
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
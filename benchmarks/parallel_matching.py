@@ -0,0 +1,60 @@
+"""Time one multi-image check of the native engine by worker count.
+
+Matches every dashboard component in ``tests/robot/images`` against one
+frame of the dashboard screenshot, as ``Wait For All Images`` does on each
+polling cycle, and compares the pool with a single-template search.
+
+Run from the repository root after ``pip install -e .[native]``::
+
+    python benchmarks/parallel_matching.py --workers 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+from SikuliPlusLibrary.native.capture import Frame
+from SikuliPlusLibrary.native.engine import NativeEngine
+from SikuliPlusLibrary.native.templates import TemplateCache
+
+IMAGES = Path(__file__).resolve().parent.parent / "tests" / "robot" / "images" / "dashboard"
+
+
+def timed(function, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--similarity", type=float, default=0.7)
+    args = parser.parse_args()
+
+    templates = TemplateCache()
+    frame = Frame(templates.get(str(IMAGES / "dashboard.png")).gray)
+    images = sorted(str(path) for path in (IMAGES / "components").glob("*.png"))
+
+    print(f"{os.cpu_count()} CPUs, {len(images)} templates")
+    print(f"{'workers':>7} {'ms':>9} {'vs single':>9}")
+    for workers in dict.fromkeys(args.workers):
+        # No location hints: every repeat does the full search.
+        engine = NativeEngine(templates=templates, location_hints=False, workers=workers)
+        engine.search_screens([(frame, None)], images, args.similarity)  # Warm the pool and the template cache.
+        single = timed(lambda: engine.search(frame, images[0], args.similarity), args.repeat)
+        duration = timed(lambda: engine.search_screens([(frame, None)], images, args.similarity), args.repeat)
+        print(f"{workers:>7} {duration:>9.1f} {duration / single:>8.1f}x")
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
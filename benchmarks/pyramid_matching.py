@@ -0,0 +1,86 @@
+"""Compare full-resolution and coarse-to-fine template search by screen size.
+
+Synthesizes screens from the dashboard screenshot in ``tests/robot/images``,
+scaled to common monitor resolutions, and times the native matcher with and
+without pyramid levels for a template that is on screen (hit) and one that
+is not (miss, which always ends with a full-resolution confirmation).
+
+Run from the repository root after ``pip install -e .[native]``::
+
+    python benchmarks/pyramid_matching.py --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from SikuliPlusLibrary.native.matcher import best_match, build_pyramid, pyramid_match
+
+IMAGES = Path(__file__).resolve().parent.parent / "tests" / "robot" / "images"
+SCREENS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4K": (3840, 2160),
+}
+
+
+def load_gray(path: Path, size=None) -> np.ndarray:
+    with Image.open(path) as image:
+        image = image.convert("L")
+        if size is not None:
+            image = image.resize(size, Image.Resampling.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+
+
+def timed(function, repeat: int) -> tuple:
+    durations, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--candidates", type=int, default=5)
+    parser.add_argument("--similarity", type=float, default=0.7)
+    args = parser.parse_args()
+
+    print(f"{'screen':>6} {'case':>4} {'levels':>6} {'ms':>9} {'speedup':>8}  result")
+    for name, size in SCREENS.items():
+        screen = load_gray(IMAGES / "dashboard" / "dashboard.png", size)
+        height, width = screen.shape
+        present = screen[height // 3:height // 3 + height // 8, width // 4:width // 4 + width // 6].copy()
+        absent = load_gray(IMAGES / "dashboard_2.jpg", (present.shape[1], present.shape[0]))
+
+        for case, template in (("hit", present), ("miss", absent)):
+            baseline, expected = timed(lambda: best_match(screen, template, args.similarity), args.repeat)
+            print(f"{name:>6} {case:>4} {0:>6} {baseline:>9.1f} {1:>7.1f}x  {expected}")
+
+            for levels in args.levels:
+                template_levels = build_pyramid(template, levels)
+
+                def search():
+                    # The frame pyramid is built per capture, so it is part of the cost.
+                    return pyramid_match(build_pyramid(screen, levels), template_levels, args.similarity, args.candidates)
+
+                duration, result = timed(search, args.repeat)
+                same = (result is None) == (expected is None) and (result is None or result.region == expected.region)
+                print(
+                    f"{name:>6} {case:>4} {levels:>6} {duration:>9.1f} {baseline / duration:>7.1f}x  "
+                    f"{'identical' if same else f'DIFFERENT: {result}'}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,111 +1,380 @@
-from SikuliLibrary import SikuliLibrary
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+
+from robot.api import logger
 from robot.api.deco import library, keyword
-from typing import Optional, Union, List, Any
-from .modules.vision import VisionModule
+from typing import Optional, Union, Any, TYPE_CHECKING
+from .anchors import AnchorRegistry
+from .config import Config
+from .dispatch import compile_binders
+from .stats import KeywordRecord, stats
+
+if TYPE_CHECKING:
+    from SikuliLibrary import SikuliLibrary
+    from .modules.vision import VisionModule
+    from .rpc import CommandChannel
+    from .state import BackendState
+    from .server import ServerManager
 
 
 @library(scope="GLOBAL", listener="SELF", version="0.1.0")
 class SikuliPlusLibrary:
-    def __init__(self) -> None:
-        self.sikuli = SikuliLibrary(mode="NEW")
-        self.vision = VisionModule(self.sikuli)
+    # Placeholders for dynamic keyword management
+    _keywords = {
+        "Wait For Image": "wait_for_image",
+        "Wait For Any Image": "wait_for_any_image",
+        "Wait For All Images": "wait_for_all_images",
+        "Register Anchor": "register_anchor",
+        "Count Image": "count_image",
+        "Count Multiple Images": "count_multiple_images",
+        "Get Image Regions": "get_image_regions",
+        "Get Image Appearance Time": "get_image_appearance_time",
+        "Get Performance Stats": "get_performance_stats",
+        "Reset Performance Stats": "reset_performance_stats",
+    }
+    # Run on the library itself: they neither need nor start the backend.
+    _library_keywords = frozenset({"Register Anchor", "Get Performance Stats", "Reset Performance Stats"})
+
+    similarity_default = 0.7
+    timeout_default = 0
+    roi_default = None
+
+    _keywords_arguments = {
+        "Wait For Image": [
+            ("image",),
+            (f"timeout", timeout_default),
+            ("*",),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Wait For Any Image": [
+            ("*images",),
+            (f"timeout", timeout_default),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Wait For All Images": [
+            ("*images",),
+            (f"timeout", timeout_default),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Register Anchor": [
+            ("name",),
+            ("image",),
+            ("parent", None),
+        ],
+        "Count Image": [
+            ("image",),
+            (f"timeout", timeout_default),
+            ("*",),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Count Multiple Images": [
+            ("*images",),
+            (f"timeout", timeout_default),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Get Image Regions": [
+            ("*images",),
+            (f"timeout", timeout_default),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Get Image Appearance Time": [
+            ("image",),
+            ("*",),
+            (f"similarity", similarity_default),
+            (f"roi", roi_default),
+            ("screen", 0),
+        ],
+        "Get Performance Stats": [],
+        "Reset Performance Stats": [],
+    }
+
+    _keywords_documentation = {
+        "Wait For Image": "Waits until the specified image appears on the screen and returns the screen it "
+        "appeared on. ``screen`` takes a screen id, a list of ids or ``all``; listed screens are searched together.",
+        "Wait For Any Image": "Waits until any of the specified images appear on the screen and returns it. "
+        "``screen`` takes a screen id, a list of ids or ``all``.",
+        "Wait For All Images": "Waits until all of the specified images have appeared on the screen. "
+        "``screen`` takes a screen id, a list of ids or ``all``.",
+        "Register Anchor": "Registers a named anchor image that can be used as ``roi`` by name. "
+        "Its region is cached and only re-checked around the last position; "
+        "with ``parent``, the anchor is searched inside the parent anchor's region.",
+        "Count Image": "Waits until the image appears and returns how many times it is on the screen. "
+        "``screen`` takes a screen id, a list of ids or ``all``; counts on several screens are added up.",
+        "Count Multiple Images": "Waits until every image appears and returns a dictionary of counts per image, "
+        "all taken from the same capture of each screen. ``screen`` takes a screen id, a list of ids or ``all``.",
+        "Get Image Regions": "Like ``Count Multiple Images`` but returns the ``[x, y, w, h]`` rectangle of every "
+        "occurrence of each image. Needs ``engine=native``.",
+        "Get Image Appearance Time": "Returns when the image appeared, in seconds since the epoch, looking back "
+        "through the buffered frames. Fails if the image is not on the screen now. "
+        "Needs ``engine=native`` and ``capture_fps`` above 0.",
+        "Get Performance Stats": "Returns timings and counters of the keywords run so far, per keyword name: "
+        "``calls``, ``failures``, ``total`` and ``max`` seconds, ``matches`` and summed ``time_to_match``, "
+        "seconds per ``phases`` (``rpc``, ``roi``, ``capture``, ``match``) and ``counts`` such as "
+        "``rpc_round_trips``. With the native engine, ``template_cache`` holds the cache counters, "
+        "including ``pack_hits`` (loaded from a template pack) and ``decodes`` (decoded from the image file).",
+        "Reset Performance Stats": "Clears the totals returned by ``Get Performance Stats``.",
+    }
+
+    _keywords_arguments_types = {
+        "Wait For Image": {
+            "image": str,
+            "timeout": float,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": Union[int, list[int], str],
+            "return": int,
+        },
+        "Wait For Any Image": {
+            "images": str,
+            "timeout": float,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": Union[int, list[int], str],
+            "return": str,
+        },
+        "Wait For All Images": {
+            "images": str,
+            "timeout": float,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": Union[int, list[int], str],
+            "return": bool,
+        },
+        "Register Anchor": {
+            "name": str,
+            "image": str,
+            "parent": Optional[str],
+        },
+        "Count Image": {
+            "image": str,
+            "timeout": float,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": Union[int, list[int], str],
+            "return": int,
+        },
+        "Count Multiple Images": {
+            "images": str,
+            "timeout": float,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": Union[int, list[int], str],
+            "return": dict,
+        },
+        "Get Image Regions": {
+            "images": str,
+            "timeout": float,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": Union[int, list[int], str],
+            "return": dict,
+        },
+        "Get Image Appearance Time": {
+            "image": str,
+            "similarity": float,
+            "roi": Optional[Union[str, list[int]]],
+            "screen": int,
+            "return": float,
+        },
+        "Get Performance Stats": {
+            "return": dict,
+        },
+        "Reset Performance Stats": {},
+    }
+
+    _binders = compile_binders(_keywords, _keywords_arguments, _keywords_arguments_types)
+
+    def __init__(self, **kwargs) -> None:
+        """
+        Robot Framework library for GUI automation using image recognition (wrapper of SikuliLibrary).
+
+        Import example:\n
+        **Library**    SikuliPlusLibrary    engine=native
+
+        Main options (as arguments or _env_ vars):
+        \n**engine:**    ``sikuli`` searches through the Sikuli server, ``native`` captures and matches
+        in-process with NumPy (needs the ``native`` extra) (default sikuli)
+        \n**polling_interval:**    First delay between checks while waiting for images (default 0.05)
+        \n**polling_max_interval:**    Longest delay between checks (default 1.0)
+        \n**polling_backoff:**    Factor the delay grows by after each miss (default 1.5)
+        \n**change_detection:**    Native engine only: skip or narrow searches on frames that did not change
+        since the last miss (default True)
+        \n**template_cache_bytes:**    Native engine only: memory budget of the process-wide cache of decoded
+        template images (default 128 MiB)
+        \n**template_pack:**    Native engine only: pack file built with
+        ``python -m SikuliPlusLibrary.native.pack IMAGES_DIR``; templates in it load pre-decoded from a shared
+        memory mapping instead of their image files (default none)
+        \n**location_hints:**    Native engine only: search first around the spot each image was last found
+        (default True)
+        \n**pyramid_levels:**    Native engine only: halvings used for coarse-to-fine search, 0 searches at
+        full resolution only. Whether an image is found stays the same, but with several similar spots the one
+        reported may differ. Hits get faster, misses slightly slower since they end with a full search, so it
+        is off by default for wait loops that mostly miss (default 0)
+        \n**pyramid_candidates:**    Coarse positions re-checked at full resolution (default 5)
+        \n**scales:**    Native engine only: factors each template is also matched resized by, e.g.
+        ``1.0,1.25,1.5`` for screens at 125% or 150% of the DPI the images were captured at. The scale found
+        on a screen is tried first next time (default 1.0)
+        \n**match_workers:**    Native engine only: threads matching several images at once, 0 uses one per
+        CPU (default 0)
+        \n**hit_ranking:**    Native engine only: ``Wait For Any Image`` tries the images that matched most
+        often lately first and stops at the first match (default True)
+        \n**capture_fps:**    Native engine only: capture the screens in the background this many times per
+        second and let keywords share those frames; 0 captures on every check (default 0)
+        \n**capture_buffer:**    Frames kept per screen for ``Get Image Appearance Time`` (default 30)
+        \n**highlight:**    Highlight found images and regions on screen (default True)
+        \n**highlight_time:**    Seconds highlights stay visible; keywords do not wait for them. A ROI given as coordinates is highlighted for whole seconds, at least 1, even when the next keyword starts earlier (default 1.0)
+        \n**server_port:**    Port of the Sikuli server, offset by the pabot pool id; 0 picks a free port
+        (default 0)
+        \n**keep_server:**    Leave the Sikuli server running when robot ends so the next run on the same
+        ``server_port`` reuses it; needs a non-zero ``server_port`` (default False)
+        \n**stats:**    Time each keyword by phase and count RPC round trips, for ``Get Performance Stats``.
+        Each keyword's timings are logged at DEBUG level, so they only show in the log with
+        ``--loglevel DEBUG``; use ``stats_file`` to collect them at the default level (default True)
+        \n**stats_file:**    Also append each keyword's timings as one JSON line to this file, whatever the
+        log level (default none)
+        \n**record_file:**    Native engine only: record the screens the keywords see into this file
+        (default none)
+        \n**replay_file:**    Native engine only: search a recording instead of the live screen, on a virtual
+        clock so waits do not take real time; replay never highlights (default none)
+        """
+        self.config: Config = Config.load_config(**kwargs)
+        stats.enabled = self.config.stats
+
+        self.sikuli: Optional[SikuliLibrary] = None
+        self.rpc: Optional[CommandChannel] = None
+        self.state: Optional[BackendState] = None
+        self.server: Optional[ServerManager] = None
+        self._vision: Optional[VisionModule] = None
+        # Kept here, not on the vision module: registering an anchor does not start the backend.
+        self.anchors = AnchorRegistry()
         self.mouse = None  # Placeholder for future MouseModule
         self.keyboard = None  # Placeholder for future KeyboardModule
 
-        # Placeholders for dynamic keyword management
-        self._keywords = {
-            "Wait For Image": self.vision.wait_for_image,
-            "Wait For Any Image": self.vision.wait_for_any_image,
-            "Wait For All Images": self.vision.wait_for_all_images,
-        }
-
-        self.similarity_default = 0.7
-        self.timeout_default = 0
-        self.roi_default = None
-
-        self._keywords_arguments = {
-            "Wait For Image": [
-                ("image",),
-                (f"timeout", self.timeout_default),
-                ("*",),
-                (f"similarity", self.similarity_default),
-                (f"roi", self.roi_default),
-            ],
-            "Wait For Any Image": [
-                ("image",),
-                (f"timeout", self.timeout_default),
-                ("*",),
-                (f"similarity", self.similarity_default),
-                (f"roi", self.roi_default),
-            ],
-            "Wait For All Images": [
-                ("image",),
-                (f"timeout", self.timeout_default),
-                ("*",),
-                (f"similarity", self.similarity_default),
-                (f"roi", self.roi_default),
-            ],
-        }
-
-        self._keywords_documentation = {
-            "Wait For Image": "Waits until the specified image appears on the screen.",
-            "Wait For Any Image": "Waits until any of the specified images appear on the screen.",
-            "Wait For All Images": "Waits until all of the specified images appear on the screen.",
-        }
-
-        self._keywords_arguments_types = {
-            "Wait For Image": {
-                "image": str,
-                "timeout": float,
-                "similarity": float,
-                "roi": Optional[Union[str, list[int]]],
-            },
-            "Wait For Any Image": {
-                "image": list[str],
-                "timeout": float,
-                "similarity": float,
-                "roi": Optional[Union[str, list[int]]],
-                "return": str,
-            },
-            "Wait For All Images": {
-                "image": list[str],
-                "timeout": float,
-                "similarity": float,
-                "roi": Optional[Union[str, list[int]]],
-            },
-        }
+    @property
+    def vision(self) -> VisionModule:
+        # Built on the first keyword call, so dry runs, libdoc and suites that
+        # never touch the screen do not start the backend.
+        if self._vision is None:
+            self._vision = self._create_vision()
+        return self._vision
 
-    def run_keyword(self, name: str, args: list, kwargs: dict) -> Any:
-        """Execute keyword with automatic default argument filling."""
-        signature = self._keywords_arguments[name]
+    def _create_vision(self) -> VisionModule:
+        from SikuliLibrary import SikuliLibrary
+        from .modules.vision import VisionModule
+        from .rpc import CommandChannel
+        from .state import BackendState
+        from .server import ServerManager
+
+        if self.config.replay_file:
+            # Nothing to highlight on: the screen shown is a recording.
+            self.config = replace(self.config, highlight=False)
+
+        self.sikuli = SikuliLibrary(mode="NEW")
+        self.rpc = CommandChannel(self.sikuli)
+        self.state = BackendState(self.rpc)
+        self.server = ServerManager(
+            self.sikuli, self.rpc, self.state, port=self.config.server_port, keep_alive=self.config.keep_server
+        )
+        engine = self._create_engine()
+        if engine is None or self.config.highlight:
+            # The native engine only needs the server to draw highlights.
+            self.server.ensure_running()
+        return VisionModule(
+            self.sikuli, self.config, engine=engine, rpc=self.rpc, state=self.state, anchors=self.anchors
+        )
 
-        param_names, defaults = self._parse_kw_signature(signature)
-        print(param_names, defaults)
-        positional_args = dict(zip(param_names, args))
+    def _create_engine(self):
+        if self.config.engine != "native":
+            return None
 
-        final_kwargs = {**defaults, **positional_args, **kwargs}
-        print("final_kwargs:", final_kwargs)
+        from .native import NativeEngine
+        from .native.templates import template_cache
 
-        return self._keywords[name](**final_kwargs)
+        template_cache.max_bytes = self.config.template_cache_bytes
+        if self.config.template_pack:
+            from .native.pack import TemplatePack
 
-    def _parse_kw_signature(self, kw_signature: list) -> tuple[list[str], dict[str, Any]]:
-        """Extract parameter names and default values from signature."""
-        param_names = []
-        defaults = {}
+            template_cache.add_pack(TemplatePack(self.config.template_pack))
+        capture, clock, capture_fps = None, {}, self.config.capture_fps
+        if self.config.replay_file:
+            from .native.recording import Recording, ReplayCapture
 
-        for arg in kw_signature:
-            is_marker = arg in (("*",), ("/",))
-            if is_marker:
-                continue
+            capture = ReplayCapture(Recording(self.config.replay_file))
+            clock = {"clock": capture.clock.monotonic, "sleep": capture.clock.sleep}
+            capture_fps = 0  # Background capture would run on real time.
+        elif self.config.record_file:
+            from .native.capture import ScreenCapture
+            from .native.recording import FrameRecorder
 
-            param_name = arg[0]
-            param_names.append(param_name)
+            capture = FrameRecorder(ScreenCapture(), self.config.record_file)
 
-            is_kwarg = len(arg) == 2
-            if is_kwarg:
-                defaults[param_name] = arg[1]
+        return NativeEngine(
+            capture=capture,
+            templates=template_cache,
+            location_hints=self.config.location_hints,
+            pyramid_levels=self.config.pyramid_levels,
+            pyramid_candidates=self.config.pyramid_candidates,
+            workers=self.config.match_workers,
+            hit_ranking=self.config.hit_ranking,
+            capture_fps=capture_fps,
+            capture_buffer=self.config.capture_buffer,
+            scales=self.config.scales,
+            **clock,
+        )
+
+    def run_keyword(self, name: str, args: list, kwargs: dict) -> Any:
+        """Execute keyword with automatic default argument filling."""
+        binder = self._binders[name]
+        if name in self._library_keywords:
+            return getattr(self, binder.method)(**binder.bind(args, kwargs))
 
-        return param_names, defaults
+        vision = self.vision
+        if vision.engine is not None:
+            vision.engine.capture.mark(name)
+
+        record = None
+        try:
+            with stats.keyword(name) as record:
+                return getattr(vision, binder.method)(**binder.bind(args, kwargs))
+        finally:
+            if record is not None:
+                self._report(record)
+
+    def _report(self, record: KeywordRecord) -> None:
+        line = json.dumps(record.to_dict())
+        # DEBUG: one line per keyword is too much for the default INFO log.
+        logger.debug(f"Performance: {line}")
+        if self.config.stats_file:
+            with open(self.config.stats_file, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+    def register_anchor(self, name: str, image: str, parent: Optional[str] = None) -> None:
+        self.anchors.register(name, image, parent)
+
+    def get_performance_stats(self) -> dict:
+        snapshot: dict = stats.snapshot()
+        if self._vision is not None and self._vision.engine is not None:
+            snapshot["template_cache"] = self._vision.engine.templates.stats()
+        return snapshot
+
+    def reset_performance_stats(self) -> None:
+        stats.reset()
+        if self._vision is not None and self._vision.engine is not None:
+            self._vision.engine.templates.reset_stats()
 
     def get_keyword_names(self) -> list[str]:
         return list(self._keywords.keys())
@@ -120,7 +389,24 @@ class SikuliPlusLibrary:
         return self._keywords_arguments_types.get(name, {})
 
     def start_suite(self, name: str, attrs: dict) -> None:
-        self.sikuli.start_sikuli_process()
+        # Health check only; the first keyword starts the server. A server reused
+        # from an earlier process (keep_server) is checked too.
+        if self.server is not None and self.sikuli.remote is not None:
+            self.server.ensure_running()
+
+    def end_suite(self, name: str, attrs: dict) -> None:
+        if self.rpc is not None:
+            self.rpc.flush()
 
     def close(self) -> None:
-        self.sikuli.run_keyword("stop_remote_server")
+        if self._vision is None:
+            return
+        self._vision.highlights.close()
+        if self._vision.engine is not None:
+            self._vision.engine.close()
+        try:
+            self.rpc.flush()
+        except Exception as error:
+            # Left-over highlights or state for a server that may have crashed.
+            logger.debug(f"Could not send the last Sikuli keywords: {error}")
+        self.server.stop()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+# find(image, within) -> region or None: one quick check, no waiting.
+Finder = Callable[[str, Optional[List[int]]], Optional[List[int]]]
+# wait(image, within, timeout) -> region: raises when the image never shows up.
+Waiter = Callable[[str, Optional[List[int]], float], List[int]]
+# bounds() -> region the margin around a cached anchor without a parent stays in, e.g. its screen.
+Bounds = Callable[[], Optional[List[int]]]
+
+
+class AnchorError(Exception):
+    pass
+
+
+@dataclass
+class Anchor:
+    name: str
+    image: str
+    parent: Optional[str] = None
+    region: Optional[List[int]] = None
+
+
+class AnchorRegistry:
+    """Named UI anchors usable as ``roi``, with their last resolved region.
+
+    An anchor with a cached region is re-validated by searching only a
+    ``margin`` around that region. A nested anchor is searched inside its
+    parent's region, so resolving a chain never searches the whole screen
+    once the root is cached. Engines plug in through ``find``, ``wait`` and
+    ``bounds``, which is only asked for when a cached region is re-checked.
+    """
+
+    def __init__(self, margin: int = 10) -> None:
+        self.margin = margin
+        self._anchors: Dict[str, Anchor] = {}
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._anchors
+
+    def register(self, name: str, image: str, parent: Optional[str] = None) -> Anchor:
+        if parent is not None and parent not in self._anchors:
+            raise AnchorError(f"Parent anchor '{parent}' is not registered")
+        if parent is not None and (parent == name or self._descends_from(self._anchors[parent], name)):
+            raise AnchorError(f"Anchor '{name}' cannot be nested in itself")
+
+        self.forget(name)
+        anchor = self._anchors[name] = Anchor(name, image, parent)
+        return anchor
+
+    def image(self, name: str) -> str:
+        anchor = self._anchors.get(name)
+        if anchor is None:
+            raise AnchorError(f"Anchor '{name}' is not registered")
+        return anchor.image
+
+    def forget(self, name: str) -> None:
+        """Drop the cached region of ``name`` and of every anchor nested in it."""
+        for anchor in self._anchors.values():
+            if anchor.name == name or self._descends_from(anchor, name):
+                anchor.region = None
+
+    def resolve(
+        self, name: str, find: Finder, wait: Waiter, timeout: float, bounds: Optional[Bounds] = None
+    ) -> List[int]:
+        anchor = self._anchors.get(name)
+        if anchor is None:
+            raise AnchorError(f"Anchor '{name}' is not registered")
+
+        within = None
+        if anchor.parent is not None:
+            within = self.resolve(anchor.parent, find, wait, timeout, bounds)
+
+        if anchor.region is not None:
+            limit = within if within is not None or bounds is None else bounds()
+            region = find(anchor.image, self._around(anchor.region, limit))
+            if region is not None:
+                return self._update(anchor, region)
+
+        return self._update(anchor, wait(anchor.image, within, timeout))
+
+    def _update(self, anchor: Anchor, region: List[int]) -> List[int]:
+        region = [int(value) for value in region]
+        if region != anchor.region:
+            # Whatever is nested in it moved too.
+            self.forget(anchor.name)
+        anchor.region = region
+        return region
+
+    def _around(self, region: List[int], within: Optional[List[int]]) -> List[int]:
+        # Not clamped at 0: screens left of or above the primary one have negative coordinates.
+        x, y, width, height = region
+        margin = self.margin
+        left, top = x - margin, y - margin
+        right, bottom = x + width + margin, y + height + margin
+        if within is not None:
+            within_x, within_y, within_width, within_height = (int(value) for value in within)
+            left, top = max(left, within_x), max(top, within_y)
+            right = min(right, within_x + within_width)
+            bottom = min(bottom, within_y + within_height)
+        return [left, top, max(right - left, 0), max(bottom - top, 0)]
+
+    def _descends_from(self, anchor: Anchor, name: str) -> bool:
+        parent = anchor.parent
+        while parent is not None:
+            if parent == name:
+                return True
+            parent = self._anchors[parent].parent
+        return False
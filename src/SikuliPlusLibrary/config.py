@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Tuple
+import os
+
+
+ENGINES = ("sikuli", "native")
+
+
+class ConfigError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Config:
+    engine: str = "sikuli"
+    polling_interval: float = 0.05
+    polling_max_interval: float = 1.0
+    polling_backoff: float = 1.5
+    change_detection: bool = True
+    template_cache_bytes: int = 128 * 1024 * 1024
+    template_pack: str = ""
+    location_hints: bool = True
+    pyramid_levels: int = 0
+    pyramid_candidates: int = 5
+    scales: Tuple[float, ...] = (1.0,)
+    match_workers: int = 0
+    hit_ranking: bool = True
+    capture_fps: float = 0
+    capture_buffer: int = 30
+    highlight: bool = True
+    highlight_time: float = 1.0
+    server_port: int = 0
+    keep_server: bool = False
+    stats: bool = True
+    stats_file: str = ""
+    record_file: str = ""
+    replay_file: str = ""
+
+    @classmethod
+    def from_kwargs(cls, **kwargs: Any) -> Dict[str, Any]:
+        coerced = _coerce_types(kwargs)
+        _validate_config_values(coerced)
+        return coerced
+
+    @classmethod
+    def from_environment(cls, prefix: str = "SIKULIPLUS_") -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for env_name, env_value in os.environ.items():
+            if not env_name.startswith(prefix):
+                continue
+            key = env_name[len(prefix):].lower()
+            key = key.replace("-", "_")
+            out[key] = env_value
+
+        return cls.from_kwargs(**out)
+
+    @classmethod
+    def load_config(cls, **kwargs: Any) -> Config:
+        defaults = {field.name: field.default for field in fields(cls)}
+
+        kwargs_dict = cls.from_kwargs(**kwargs)
+
+        env_dict = cls.from_environment("SIKULIPLUS_")
+
+        merged = {**defaults, **kwargs_dict, **env_dict}
+        # Combined options may come from different sources.
+        _validate_combinations(merged)
+
+        return cls(**merged)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.__dict__
+
+
+def _coerce_types(raw: Dict[str, Any]) -> Dict[str, Any]:
+    TYPE_MAPPING = {
+        "engine": lambda value: str(value).strip().lower(),
+        "polling_interval": float,
+        "polling_max_interval": float,
+        "polling_backoff": float,
+        "change_detection": coerce_bool,
+        "template_cache_bytes": int,
+        "template_pack": lambda value: str(value).strip(),
+        "location_hints": coerce_bool,
+        "pyramid_levels": int,
+        "pyramid_candidates": int,
+        "scales": coerce_scales,
+        "match_workers": int,
+        "hit_ranking": coerce_bool,
+        "capture_fps": float,
+        "capture_buffer": int,
+        "highlight": coerce_bool,
+        "highlight_time": float,
+        "server_port": int,
+        "keep_server": coerce_bool,
+        "stats": coerce_bool,
+        "stats_file": lambda value: str(value).strip(),
+        "record_file": lambda value: str(value).strip(),
+        "replay_file": lambda value: str(value).strip(),
+    }
+
+    out: Dict[str, Any] = {}
+    for raw_key, raw_value in raw.items():
+        normalized_key = raw_key.lower()
+
+        if normalized_key in TYPE_MAPPING:
+            converter = TYPE_MAPPING[normalized_key]
+            try:
+                out[normalized_key] = converter(raw_value)
+            except (ValueError, TypeError) as e:
+                raise ConfigError(f"Invalid value for '{raw_key}': {raw_value}. {str(e)}") from e
+        else:
+            pass  # Ignore unknown keys
+
+    return out
+
+
+def coerce_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        lowered = value.lower()
+        if lowered == "true":
+            return True
+        elif lowered == "false":
+            return False
+        else:
+            raise ValueError("string must be 'true' or 'false' (case insensitive)")
+    else:
+        return bool(value)
+
+
+def coerce_scales(value: Any) -> Tuple[float, ...]:
+    if isinstance(value, str):
+        value = [item for item in value.replace(";", ",").split(",") if item.strip()]
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    # Duplicates would only repeat a search.
+    return tuple(dict.fromkeys(float(item) for item in value))
+
+
+def _validate_config_values(config_dict: Dict[str, Any]) -> None:
+    if "engine" in config_dict:
+        if config_dict["engine"] not in ENGINES:
+            raise ConfigError(f"'engine' must be one of: {', '.join(ENGINES)}")
+
+    if "polling_interval" in config_dict:
+        if float(config_dict["polling_interval"]) <= 0:
+            raise ConfigError("'polling_interval' must be > 0")
+
+    if "polling_max_interval" in config_dict:
+        if float(config_dict["polling_max_interval"]) <= 0:
+            raise ConfigError("'polling_max_interval' must be > 0")
+
+    if "polling_backoff" in config_dict:
+        if float(config_dict["polling_backoff"]) < 1:
+            raise ConfigError("'polling_backoff' must be >= 1")
+
+    if "template_cache_bytes" in config_dict:
+        if int(config_dict["template_cache_bytes"]) < 0:
+            raise ConfigError("'template_cache_bytes' must be >= 0")
+
+    if "pyramid_levels" in config_dict:
+        if int(config_dict["pyramid_levels"]) < 0:
+            raise ConfigError("'pyramid_levels' must be >= 0")
+
+    if "pyramid_candidates" in config_dict:
+        if int(config_dict["pyramid_candidates"]) < 1:
+            raise ConfigError("'pyramid_candidates' must be >= 1")
+
+    if "scales" in config_dict:
+        if not config_dict["scales"] or min(config_dict["scales"]) <= 0:
+            raise ConfigError("'scales' must list one or more factors > 0")
+
+    if "match_workers" in config_dict:
+        if int(config_dict["match_workers"]) < 0:
+            raise ConfigError("'match_workers' must be >= 0")
+
+    if "capture_fps" in config_dict:
+        if float(config_dict["capture_fps"]) < 0:
+            raise ConfigError("'capture_fps' must be >= 0")
+
+    if "capture_buffer" in config_dict:
+        if int(config_dict["capture_buffer"]) < 1:
+            raise ConfigError("'capture_buffer' must be >= 1")
+
+    if "highlight_time" in config_dict:
+        if float(config_dict["highlight_time"]) < 0:
+            raise ConfigError("'highlight_time' must be >= 0")
+
+    if "server_port" in config_dict:
+        if not 0 <= int(config_dict["server_port"]) <= 65535:
+            raise ConfigError("'server_port' must be between 0 and 65535")
+
+
+def _validate_combinations(config_dict: Dict[str, Any]) -> None:
+    if config_dict["keep_server"] and not config_dict["server_port"]:
+        # A server on a random port could never be found again, only leaked.
+        raise ConfigError("'keep_server' needs a fixed 'server_port'")
+
+    if config_dict["record_file"] and config_dict["replay_file"]:
+        raise ConfigError("'record_file' and 'replay_file' cannot be used together")
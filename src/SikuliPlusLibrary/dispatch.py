@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class KeywordBinder:
+    """Maps Robot's positional and named arguments onto a keyword method.
+
+    Signatures use the dynamic API format of ``get_keyword_arguments`` and
+    are compiled once, so binding a call is a copy of the defaults plus the
+    given arguments.
+    """
+
+    __slots__ = ("method", "positional", "varargs", "defaults", "converters")
+
+    def __init__(self, method: str, signature: list, types: Optional[Dict[str, Any]] = None) -> None:
+        self.method = method
+        self.positional: Tuple[str, ...] = ()
+        self.varargs: Optional[str] = None
+        self.defaults: Dict[str, Any] = {}
+
+        names: List[str] = []
+        keyword_only = False
+        for arg in signature:
+            name = arg[0]
+            if name == "/":
+                continue
+            if name.startswith("*"):
+                # ``*`` alone only marks the start of keyword-only arguments.
+                self.varargs = name[1:] or None
+                keyword_only = True
+                continue
+            if not keyword_only:
+                names.append(name)
+            if len(arg) == 2:
+                self.defaults[name] = arg[1]
+        self.positional = tuple(names)
+
+        # Only plain classes convert; Robot already handled unions like ``roi``.
+        self.converters: Tuple[Tuple[str, Callable[[Any], Any]], ...] = tuple(
+            (name, converter)
+            for name, converter in (types or {}).items()
+            if name != "return" and isinstance(converter, type)
+        )
+
+    def bind(self, args: list, kwargs: dict) -> Dict[str, Any]:
+        bound = self.defaults.copy()
+        bound.update(zip(self.positional, args))
+        if self.varargs is not None:
+            bound[self.varargs] = list(args[len(self.positional):])
+        bound.update(kwargs)
+
+        for name, converter in self.converters:
+            value = bound.get(name)
+            if name == self.varargs:
+                bound[name] = [item if type(item) is converter else converter(item) for item in value]
+            elif value is not None and type(value) is not converter:
+                bound[name] = converter(value)
+        return bound
+
+
+def compile_binders(
+    keywords: Dict[str, str], arguments: Dict[str, list], types: Dict[str, Dict[str, Any]]
+) -> Dict[str, KeywordBinder]:
+    return {
+        name: KeywordBinder(method, arguments.get(name, []), types.get(name))
+        for name, method in keywords.items()
+    }
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from .rpc import CommandChannel
+
+
+class HighlightScheduler:
+    """Draws highlights without making keywords wait for them to disappear.
+
+    Image highlights stay on screen until ``Clear All Highlights``, which is
+    sent from a timer ``highlight_time`` seconds after the keyword returns.
+    When the next keyword starts first, the timer is cancelled and the clear
+    goes out ahead of that keyword's own primitives instead. The Sikuli
+    engine queues both with the keyword's primitives; the native engine,
+    which has nothing else to send, hands them to a background sender that
+    keeps their order.
+
+    ``Highlight Region`` is only used for a ROI given as coordinates, where
+    there is no image to highlight. It blocks on the server for its whole
+    duration and cannot be cancelled or cleared, so it is drawn from daemon
+    threads that nobody waits for; the next keyword only skips the ones not
+    sent yet.
+    """
+
+    def __init__(self, rpc: CommandChannel, highlight_time: float = 1.0) -> None:
+        self.rpc = rpc
+        self.highlight_time = highlight_time
+        self._timer: Optional[threading.Timer] = None
+        self._generation = 0
+        self._keyword = 0
+        self._drawing: List[threading.Thread] = []
+        self._sender: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def begin(self, background: bool = False) -> None:
+        """Call before a keyword searches or draws anything: old highlights must go first.
+
+        With ``background`` the clear is sent right away from the sender,
+        instead of waiting for the keyword's first round trip.
+        """
+        with self._lock:
+            self._generation += 1
+            self._keyword += 1
+            self._drawing = [drawing for drawing in self._drawing if drawing.is_alive()]
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+                if background:
+                    self._post([("Clear All Highlights", [])])
+                else:
+                    self.rpc.defer("Clear All Highlights", [])
+
+    def draw(self, image: str) -> None:
+        self.rpc.defer("Highlight", [image])
+
+    def draw_in_background(self, images: List[Tuple[str, int]]) -> None:
+        """Highlight ``(image, screen)`` pairs in one round trip from the sender."""
+        batch = []
+        for image, screen in images:
+            # The server only serves highlights on the native engine, so its screen is free to move.
+            batch += [("Change Screen Id", [screen]), ("Highlight", [image])]
+        if batch:
+            with self._lock:
+                self._post(batch)
+
+    def draw_region(self, region: List[int]) -> None:
+        # Highlight Region only takes whole seconds, see ``highlight_time`` in the library docs.
+        seconds = max(1, round(self.highlight_time))
+        with self._lock:
+            thread = threading.Thread(
+                target=self._draw_region, args=(self._keyword, list(region), seconds), daemon=True
+            )
+            self._drawing.append(thread)
+        thread.start()
+
+    def schedule_clear(self) -> None:
+        """Clear image highlights ``highlight_time`` seconds from now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._generation += 1
+            self._timer = threading.Timer(self.highlight_time, self._clear, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _draw_region(self, keyword: int, region: List[int], seconds: int) -> None:
+        with self._lock:
+            if keyword != self._keyword:
+                return  # The next keyword already started.
+        self._run_in_background([("Highlight Region", [region, seconds])])
+
+    def _clear(self, generation: int) -> None:
+        with self._lock:
+            # A keyword that started in the meantime already sent its own clear.
+            if generation != self._generation or self._timer is None:
+                return
+            self._timer = None
+            self._post([("Clear All Highlights", [])])
+
+    def _post(self, batch: List[Tuple[str, list]]) -> None:
+        # Called with ``_lock`` held, so batches reach the single sender thread in order.
+        if self._sender is None:
+            self._sender = ThreadPoolExecutor(1, thread_name_prefix="SikuliPlusHighlight")
+        self._sender.submit(self._run_in_background, batch)
+
+    def _run_in_background(self, batch: List[Tuple[str, list]]) -> None:
+        # Own connection, so a long wait on ``rpc`` does not delay highlights.
+        channel = CommandChannel(self.rpc.sikuli)
+        try:
+            for name, args in batch:
+                channel.defer(name, args)
+            channel.flush()
+        except Exception:
+            # Nothing to report to: the keyword that drew it has already returned,
+            # and a server that went away has no highlights left to remove.
+            pass
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Clear pending highlights now and let region highlights finish, e.g. before stopping the server."""
+        with self._lock:
+            self._generation += 1
+            self._keyword += 1
+            pending, self._timer = self._timer, None
+            drawing, self._drawing = self._drawing, []
+            sender, self._sender = self._sender, None
+        if sender is not None:
+            sender.shutdown(wait=True)
+        if pending is not None:
+            pending.cancel()
+            self._run_in_background([("Clear All Highlights", [])])
+        for thread in drawing:
+            thread.join(timeout)
@@ -0,0 +1,201 @@
+from SikuliLibrary import SikuliLibrary
+from contextlib import contextmanager
+from robot.api import logger
+from typing import Optional, Union, List, Dict, Sequence, TYPE_CHECKING
+from ..anchors import AnchorRegistry
+from ..config import Config
+from ..highlight import HighlightScheduler
+from ..polling import PollingScheduler
+from ..stats import stats
+
+if TYPE_CHECKING:
+    from ..native import NativeEngine, Match
+    from ..native.matcher import Region
+
+
+class ImageNotFoundError(Exception):
+    pass
+
+
+class NativeVisionMixin:
+    sikuli: SikuliLibrary
+    config: Config
+    engine: "NativeEngine"
+    highlights: HighlightScheduler
+    anchors: AnchorRegistry
+
+    def _native_polling(self, timeout: float) -> PollingScheduler:
+        # On the engine's clock, which is virtual when replaying a recording.
+        return PollingScheduler.from_config(timeout, self.config, clock=self.engine.clock, sleep=self.engine.sleep)
+
+    def _existing_images(self, images: List[str]) -> List[str]:
+        """``images`` without missing files, which count as not visible, as on the Sikuli engine."""
+        existing = self.engine.available(images)
+        for image in images:
+            if image not in existing:
+                logger.warn(f"Image file not found, it counts as not visible: '{image}'")
+        return existing
+
+    def _wait_for_matches(
+        self,
+        images: List[str],
+        timeout: float,
+        similarity: float,
+        region: Optional["Region"] = None,
+        *,
+        required: int,
+        screens: Sequence[int] = (0,),
+    ) -> Dict[str, "Match"]:
+        """Poll until ``required`` images were seen, capturing each screen once per cycle."""
+        images = self._existing_images(images)
+        found: Dict[str, "Match"] = {}
+        detectors = {}
+        if self.config.change_detection:
+            detectors = {screen: self.engine.track_changes() for screen in screens}
+
+        for _ in self._native_polling(timeout):
+            pending = [image for image in images if image not in found]
+
+            with stats.phase("capture"):
+                grabbed = self.engine.grab_screens(region, list(screens))
+            stats.count("captures", len(grabbed))
+
+            frames = []
+            for frame in grabbed:
+                changed = None
+                if detectors:
+                    changed = detectors[frame.screen].update(frame)
+                    if changed is None:
+                        continue  # Same pixels as the last miss: still a miss.
+                frames.append((frame, changed))
+
+            if not frames:
+                continue
+
+            with stats.phase("match"):
+                if required == 1:
+                    # Any-of: the first hit ends the cycle, the other searches are dropped.
+                    hit = self.engine.search_any_screen(frames, pending, similarity)
+                    if hit is not None:
+                        image, match = hit
+                        found[image] = match
+                else:
+                    found.update(self.engine.search_screens(frames, pending, similarity))
+            stats.count("match_cycles")
+
+            if found:
+                stats.matched()
+
+            if len(found) >= required:
+                break
+
+        return found
+
+    def _wait_for_match(
+        self,
+        image: str,
+        timeout: float,
+        similarity: float,
+        region: Optional["Region"] = None,
+        screens: Sequence[int] = (0,),
+    ) -> "Match":
+        found = self._wait_for_matches([image], timeout, similarity, region, required=1, screens=screens)
+        if not found:
+            raise ImageNotFoundError(f"Image '{image}' not visible after {timeout} seconds")
+
+        return found[image]
+
+    def _count_matches(
+        self,
+        images: List[str],
+        timeout: float,
+        similarity: float,
+        region: Optional["Region"] = None,
+        screens: Sequence[int] = (0,),
+    ) -> Dict[str, List["Match"]]:
+        """Poll until every image shows up once, then report all occurrences from that one capture of each screen."""
+        existing = self._existing_images(images)
+        per_screen: Dict[int, Dict[str, List["Match"]]] = {}
+        detectors = {}
+        if self.config.change_detection:
+            detectors = {screen: self.engine.track_changes() for screen in screens}
+
+        matches: Dict[str, List["Match"]] = {image: [] for image in images}
+        for _ in self._native_polling(timeout):
+            with stats.phase("capture"):
+                grabbed = self.engine.grab_screens(region, list(screens))
+            stats.count("captures", len(grabbed))
+
+            changed = [frame for frame in grabbed if not detectors or detectors[frame.screen].update(frame) is not None]
+            if not changed:
+                continue  # Same pixels, same counts.
+
+            with stats.phase("match"):
+                for frame in changed:
+                    per_screen[frame.screen] = self.engine.search_all_many(frame, existing, similarity)
+            stats.count("match_cycles")
+
+            matches = {
+                image: [match for screen in screens for match in per_screen.get(screen, {}).get(image, [])]
+                for image in images
+            }
+            if all(matches.values()):
+                stats.matched()
+                break
+
+        return matches
+
+    def _native_roi(
+        self,
+        roi: Optional[Union[str, List[int]]],
+        timeout: float,
+        similarity: float,
+        screens: Sequence[int] = (0,),
+    ) -> Optional["Region"]:
+        if roi is None:
+            return None
+
+        if isinstance(roi, str):
+            with stats.phase("roi"):
+                if roi in self.anchors:
+                    return tuple(self._resolve_native_anchor(roi, timeout, similarity, screens))
+                return self._wait_for_match(roi, timeout, similarity, screens=screens).region
+
+        x, y, width, height = (int(value) for value in roi)
+        return (x, y, width, height)
+
+    def _resolve_native_anchor(
+        self, name: str, timeout: float, similarity: float, screens: Sequence[int] = (0,)
+    ) -> List[int]:
+        def find(image: str, within: Optional[List[int]]) -> Optional[List[int]]:
+            try:
+                frames = self.engine.grab_screens(tuple(within) if within else None, list(screens))
+            except ValueError:
+                return None  # Cached spot is off screen now.
+            found = self.engine.search_screens([(frame, None) for frame in frames], [image], similarity)
+            return list(found[image].region) if image in found else None
+
+        def wait(image: str, within: Optional[List[int]], timeout: float) -> List[int]:
+            region = tuple(within) if within else None
+            return list(self._wait_for_match(image, timeout, similarity, region, screens).region)
+
+        return self.anchors.resolve(name, find, wait, timeout)
+
+    @contextmanager
+    def _native_highlight_context(self):
+        # Entered before the ROI is resolved, so old highlights are gone before anything is searched.
+        highlights_enabled = self.config.highlight
+        self.highlights.begin(background=True)
+        drawn = []
+
+        def add_highlight(image: str, match: "Match") -> None:
+            if highlights_enabled:
+                drawn.append((image, match.screen))
+
+        try:
+            yield add_highlight
+        finally:
+            if drawn:
+                # Clearable image highlights, sent in the background: the keyword returns at once.
+                self.highlights.draw_in_background(drawn)
+                self.highlights.schedule_clear()
@@ -1,70 +1,115 @@
 from SikuliLibrary import SikuliLibrary
 from contextlib import contextmanager
-import time
-from typing import Optional, Union, List
+from robot.errors import RemoteError
+from typing import Optional, Union, Dict, List, Sequence, Tuple
+from ..anchors import AnchorRegistry
+from ..config import Config
+from ..highlight import HighlightScheduler
+from ..rpc import CommandChannel, PendingResult
+from ..state import BackendState
+from ..stats import stats
 
 
 class VisionContextMixin:
     sikuli: SikuliLibrary
+    rpc: CommandChannel
+    config: Config
+    highlights: HighlightScheduler
+    state: BackendState
+    anchors: AnchorRegistry
+    _screen_regions: Dict[int, PendingResult]
 
     @contextmanager
     def _similarity_context(self, similarity: float):
-        # Placeholder for default similarity value from config
-        if similarity == 0.7:
-            yield None
-            return None
-
-        previous_similarity = self.sikuli.run_keyword(
-            "Set Min Similarity", [similarity]
-        )
-        try:
-            yield similarity
-        finally:
-            self.sikuli.run_keyword("Set Min Similarity", [previous_similarity])
+        # Left in place afterwards: the next keyword only pays for a change.
+        self.state.set_similarity(similarity)
+        yield similarity
 
     @contextmanager
-    def _roi_context(self, roi: Optional[Union[str, List[int]]], timeout: float):
-        if roi is None:
-            yield None
-            return None
+    def _roi_context(self, roi: Optional[Union[str, List[int]]], timeout: float, screen: int = 0):
+        highlights_enabled = self.config.highlight
+
+        if isinstance(roi, str):
+            # The anchor itself is searched on the whole screen.
+            self.state.set_roi(None)
+            with stats.phase("roi"):
+                if roi in self.anchors:
+                    roi_coords = self.anchors.resolve(
+                        roi, self._find_roi, self._locate_roi, timeout, self._screen_region(screen).result
+                    )
+                else:
+                    roi_coords = self._locate_roi(roi, None, timeout)
+            self.state.set_roi(roi_coords)
+
+            if highlights_enabled:
+                # Searched inside the new ROI, which is exactly where it was found.
+                self.highlights.draw(self.anchors.image(roi) if roi in self.anchors else roi)
+        else:
+            self.state.set_roi(roi)
+            if roi is not None and highlights_enabled:
+                self.highlights.draw_region(roi)
 
-        highlights_enabled = True  # Placeholder for self.config.highlight
+        yield roi
 
+    def _screen_region(self, screen: int) -> PendingResult:
+        """``[x, y, w, h]`` of ``screen``, so anchor margins stay on it.
+
+        Asked once per screen, along with the first anchor lookup on it: that
+        lookup has no cached region yet, so it never waits for the answer.
+        """
+        if screen not in self._screen_regions:
+            # Queued after the keyword's Change Screen Id.
+            self._screen_regions[screen] = self.rpc.defer("Get Screen Coordinates", [])
+        return self._screen_regions[screen]
+
+    def _find_roi(self, image: str, within: Optional[List[int]]) -> Optional[List[int]]:
         try:
-            if isinstance(roi, str):
-                self.sikuli.run_keyword("Wait Until Screen Contain", [roi, timeout])
-                roi_coords = self.sikuli.run_keyword("Get Image Coordinates", [roi])
-                self.sikuli.run_keyword("Set Roi", [roi_coords])
-
-                if highlights_enabled:
-                    self.sikuli.run_keyword("Highlight", [roi])
-            else:
-                self.sikuli.run_keyword("Set Roi", [roi])
-                if highlights_enabled:
-                    temp_roi_image = self.sikuli.run_keyword(
-                        "Capture Roi", ["temp_roi_region.png"]
-                    )
-                    self.sikuli.run_keyword("Highlight", [temp_roi_image])
+            return self.rpc.run_keyword("Get Image Coordinates", [image, within or []])
+        except RemoteError:
+            return None
 
-            yield roi
+    def _locate_roi(self, image: str, within: Optional[List[int]], timeout: float) -> List[int]:
+        # One search when the anchor is already visible; only wait on a miss.
+        try:
+            return self.rpc.run_keyword("Get Image Coordinates", [image, within or []])
+        except RemoteError:
+            if not timeout:
+                raise
+        self.state.set_roi(within)
+        self.rpc.run_keyword("Wait Until Screen Contain", [image, timeout])
+        return self.rpc.run_keyword("Get Image Coordinates", [image, within or []])
 
-        finally:
-            self.sikuli.run_keyword("Reset Roi", [])
+    def _exists_on_screens(self, images: List[str], screens: Sequence[int]) -> List[Tuple[str, int]]:
+        """``(image, screen)`` of every image on every screen, checked in a single round trip."""
+        checks = []
+        for screen in screens:
+            self.state.set_screen(screen)
+            checks += [(image, screen, self.rpc.defer("Exists", [image, 0])) for image in images]
+        self.rpc.flush()
+        hits = [(image, screen) for image, screen, exists in checks if exists.result()]
+        if hits:
+            stats.matched()
+        return hits
+
+    def _highlights_after(self, image: str) -> List[Tuple[str, list]]:
+        """``then`` for a blocking call that waits for ``image``: highlight it in the same round trip."""
+        return [("Highlight", [image])] if self.config.highlight else []
 
     @contextmanager
     def _highlight_context(self):
-        highlights_enabled = True  # Placeholder for self.config.highlight
+        highlights_enabled = self.config.highlight
 
         def add_highlight(image: str) -> None:
             if highlights_enabled:
-                self.sikuli.run_keyword("Highlight", [image])
+                self.highlights.draw(image)
 
         try:
             yield add_highlight
         finally:
             if highlights_enabled:
-                time.sleep(1)  # Simulate highlight duration from config
-                self.sikuli.run_keyword("Clear All Highlights", [])
+                # Highlights stay up after the keyword returns and are cleared
+                # by a timer, or by the next keyword if it starts first.
+                self.highlights.schedule_clear()
 
     @contextmanager
     def _vision_context(
@@ -72,8 +117,17 @@ class VisionContextMixin:
         similarity: float,
         timeout: float = 0,
         roi: Optional[Union[str, List[int]]] = None,
+        screen: int = 0,
     ):
-        with self._similarity_context(similarity):
-            with self._roi_context(roi, timeout):
-                with self._highlight_context() as add_highlight:
-                    yield add_highlight
+        # Set-up primitives ride along with the keyword's first blocking call;
+        # a failed one fails the keyword. State is not restored afterwards,
+        # see BackendState.
+        self.highlights.begin()
+        try:
+            self.state.set_screen(screen)
+            with self._similarity_context(similarity):
+                with self._roi_context(roi, timeout, screen):
+                    with self._highlight_context() as add_highlight:
+                        yield add_highlight
+        finally:
+            self.rpc.flush()
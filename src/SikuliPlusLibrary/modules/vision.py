@@ -1,19 +1,221 @@
 from SikuliLibrary import SikuliLibrary
 from ..mixins.vision_context import VisionContextMixin
-from typing import Optional, List
+from ..mixins.native_vision import NativeVisionMixin, ImageNotFoundError
+from ..config import Config
+from ..polling import PollingScheduler
+from ..rpc import CommandChannel, PendingResult
+from ..highlight import HighlightScheduler
+from ..state import BackendState
+from ..anchors import AnchorRegistry
+from ..stats import stats
+from robot.api import logger
+import time
+from typing import Optional, List, Dict, Union, TYPE_CHECKING
 
-class VisionModule(VisionContextMixin):
-    def __init__(self, sikuli: SikuliLibrary):
+if TYPE_CHECKING:
+    from ..native import NativeEngine
+
+
+Screens = Union[int, List[int], str]
+
+
+class VisionModule(VisionContextMixin, NativeVisionMixin):
+    def __init__(
+        self,
+        sikuli: SikuliLibrary,
+        config: Config,
+        engine: Optional["NativeEngine"] = None,
+        rpc: Optional[CommandChannel] = None,
+        state: Optional[BackendState] = None,
+        anchors: Optional[AnchorRegistry] = None,
+    ):
         self.sikuli = sikuli
+        self.rpc = rpc or CommandChannel(sikuli)
+        self.state = state or BackendState(self.rpc)
+        self.config = config
+        self.engine = engine
+        self.highlights = HighlightScheduler(self.rpc, config.highlight_time)
+        self.anchors = anchors or AnchorRegistry()
+        self._screen_count: Optional[int] = None
+        self._screen_regions: Dict[int, PendingResult] = {}
+
+    def wait_for_image(
+        self, image: str, timeout: int, similarity: float, roi: Optional[List[int]], screen: Screens = 0
+    ) -> int:
+        screens = self._resolve_screens(screen)
+        if self.engine is not None:
+            with self._native_highlight_context() as add_highlight:
+                region = self._native_roi(roi, timeout, similarity, screens)
+                match = self._wait_for_match(image, timeout, similarity, region, screens)
+                add_highlight(image, match)
+                return match.screen
+
+        with self._vision_context(similarity, roi=roi, timeout=timeout, screen=screens[0]) as add_highlight:
+            if len(screens) == 1:
+                self.rpc.run_keyword(
+                    "Wait Until Screen Contain", [image, timeout], then=self._highlights_after(image)
+                )
+                stats.matched()
+                return screens[0]
+
+            for _ in PollingScheduler.from_config(timeout, self.config):
+                for _, found_screen in self._exists_on_screens([image], screens):
+                    self.state.set_screen(found_screen)
+                    add_highlight(image)
+                    return found_screen
+
+            raise ImageNotFoundError(f"Image '{image}' not visible after {timeout} seconds on screens {screens}")
+
+    def wait_for_any_image(
+        self, images: List[str], timeout: int, similarity: float, roi: Optional[List[int]], screen: Screens = 0
+    ) -> Optional[str]:
+        screens = self._resolve_screens(screen)
+        if self.engine is not None:
+            with self._native_highlight_context() as add_highlight:
+                region = self._native_roi(roi, timeout, similarity, screens)
+                found = self._wait_for_matches(images, timeout, similarity, region, required=1, screens=screens)
+                if not found:
+                    raise ImageNotFoundError(f"None of the images {images} visible after {timeout} seconds")
+
+                image, match = next(iter(found.items()))
+                logger.info(f"Found '{image}' on screen {match.screen}")
+                add_highlight(image, match)
+                return image
+
+        with self._vision_context(similarity, roi=roi, timeout=timeout, screen=screens[0]) as add_highlight:
+            for _ in PollingScheduler.from_config(timeout, self.config):
+                for image, found_screen in self._exists_on_screens(images, screens):
+                    logger.info(f"Found '{image}' on screen {found_screen}")
+                    self.state.set_screen(found_screen)
+                    add_highlight(image)
+                    return image
+
+            raise ImageNotFoundError(f"None of the images {images} visible after {timeout} seconds")
+
+    def wait_for_all_images(
+        self, images: List[str], timeout: int, similarity: float, roi: Optional[List[int]], screen: Screens = 0
+    ) -> bool:
+        screens = self._resolve_screens(screen)
+        if self.engine is not None:
+            with self._native_highlight_context() as add_highlight:
+                region = self._native_roi(roi, timeout, similarity, screens)
+                found = self._wait_for_matches(
+                    images, timeout, similarity, region, required=len(images), screens=screens
+                )
+                for image, match in found.items():
+                    logger.info(f"Found '{image}' on screen {match.screen}")
+                    add_highlight(image, match)
+
+                missing = [image for image in images if image not in found]
+                if missing:
+                    raise ImageNotFoundError(f"Images not visible after {timeout} seconds: {missing}")
+                return True
+
+        with self._vision_context(similarity, roi=roi, timeout=timeout, screen=screens[0]) as add_highlight:
+            found_images = set()
+
+            for _ in PollingScheduler.from_config(timeout, self.config):
+                pending = [image for image in images if image not in found_images]
+                for image, found_screen in self._exists_on_screens(pending, screens):
+                    if image in found_images:
+                        continue
+                    logger.info(f"Found '{image}' on screen {found_screen}")
+                    found_images.add(image)
+                    self.state.set_screen(found_screen)
+                    add_highlight(image)
+
+                if len(found_images) == len(images):
+                    return True
+
+            missing = [image for image in images if image not in found_images]
+            raise ImageNotFoundError(f"Images not visible after {timeout} seconds: {missing}")
+
+    def get_image_appearance_time(
+        self, image: str, similarity: float, roi: Optional[List[int]], screen: int = 0
+    ) -> float:
+        if self.engine is None or self.engine.buffer is None:
+            # Only buffered frames remember when the screen changed.
+            raise RuntimeError(
+                "Get Image Appearance Time needs recent frames: import SikuliPlusLibrary with "
+                "engine=native and capture_fps above 0, e.g. capture_fps=10"
+            )
+
+        region = self._native_roi(roi, 0, similarity, [screen])
+        since = None
+        if self._existing_images([image]):
+            since = self.engine.appeared_at(image, similarity, region, screen)
+        if since is None:
+            raise ImageNotFoundError(f"Image '{image}' not visible")
+        return time.time() - (self.engine.clock() - since)
+
+    def _resolve_screens(self, screen: Screens) -> List[int]:
+        """Screen ids from ``0``, ``[0, 2]`` or ``all``."""
+        if isinstance(screen, str) and screen.strip().lower() == "all":
+            if self.engine is not None:
+                return list(range(self.engine.screen_count()))
+            if self._screen_count is None:
+                # One round trip per library instance: monitors are not plugged in during a run.
+                self._screen_count = int(self.rpc.run_keyword("Get Number Of Screens", []))
+            return list(range(self._screen_count))
+
+        if isinstance(screen, (list, tuple)):
+            return [int(value) for value in screen]
+        return [int(screen)]
+
+    def count_image(
+        self, image: str, timeout: int, similarity: float, roi: Optional[List[int]], screen: Screens = 0
+    ) -> int:
+        return self.count_multiple_images([image], timeout, similarity, roi, screen)[image]
+
+    def count_multiple_images(
+        self, images: List[str], timeout: int, similarity: float, roi: Optional[List[int]], screen: Screens = 0
+    ) -> Dict[str, int]:
+        if self.engine is not None:
+            regions = self.get_image_regions(images, timeout, similarity, roi, screen)
+            return {image: len(found) for image, found in regions.items()}
+
+        screens = self._resolve_screens(screen)
+        with self._vision_context(similarity, roi=roi, timeout=timeout, screen=screens[0]) as add_highlight:
+            counts: Dict[str, int] = {image: 0 for image in images}
+            seen_on: Dict[str, int] = {}
+
+            for _ in PollingScheduler.from_config(timeout, self.config):
+                checks = []
+                for found_screen in screens:
+                    self.state.set_screen(found_screen)
+                    checks += [(image, found_screen, self.rpc.defer("Image Count", [image])) for image in images]
+                self.rpc.flush()
+
+                counts = {image: 0 for image in images}
+                seen_on = {}
+                for image, found_screen, count in checks:
+                    found = int(count.result() or 0)
+                    counts[image] += found
+                    if found:
+                        seen_on.setdefault(image, found_screen)
+                if all(counts.values()):
+                    stats.matched()
+                    break
+
+            for image, found_screen in seen_on.items():
+                self.state.set_screen(found_screen)
+                add_highlight(image)
+            return counts
+
+    def get_image_regions(
+        self, images: List[str], timeout: int, similarity: float, roi: Optional[List[int]], screen: Screens = 0
+    ) -> Dict[str, List[List[int]]]:
+        if self.engine is None:
+            # The Sikuli server only reports how many matches there are, not where.
+            raise RuntimeError(
+                "Get Image Regions needs the native engine: import SikuliPlusLibrary with engine=native"
+            )
 
-    def wait_for_image(self, image: str, timeout: int, similarity: float, roi: Optional[List[int]]) -> Optional[str]:
-        with self._vision_context(similarity, roi=roi, timeout=timeout) as add_highlight:
-            self.sikuli.run_keyword("Wait Until Screen Contain", [image, timeout])
-            add_highlight(image)
-            return
-    
-    def wait_for_any_image(self, images: List[str], timeout: int = 0) -> Optional[str]:
-        raise NotImplementedError("This method should be implemented in the future.")
-
-    def wait_for_all_images(self, images: List[str], timeout: int = 0) -> bool:
-        raise NotImplementedError("This method should be implemented in the future.")
\ No newline at end of file
+        screens = self._resolve_screens(screen)
+        with self._native_highlight_context() as add_highlight:
+            region = self._native_roi(roi, timeout, similarity, screens)
+            found = self._count_matches(images, timeout, similarity, region, screens)
+            for image, matches in found.items():
+                if matches:
+                    add_highlight(image, matches[0])
+            return {image: [list(match.region) for match in matches] for image, matches in found.items()}
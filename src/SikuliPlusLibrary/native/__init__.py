@@ -0,0 +1,18 @@
+"""In-process screen capture and template matching (``engine=native``)."""
+
+try:
+    import mss  # noqa: F401
+    import numpy  # noqa: F401
+    import PIL  # noqa: F401
+except ImportError as error:
+    raise ImportError(
+        "The native engine needs extra packages. "
+        "Install them with: pip install robotframework-SikuliPlusLibrary[native]"
+    ) from error
+
+from .engine import NativeEngine
+from .matcher import Match
+from .pack import TemplatePack, build_pack
+from .templates import TemplateCache, template_cache
+
+__all__ = ["NativeEngine", "Match", "TemplatePack", "build_pack", "TemplateCache", "template_cache"]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .capture import Frame, ScreenCapture
+
+
+class FrameBuffer:
+    """Background capture of whole screens into a ring buffer of recent frames.
+
+    A daemon thread grabs every screen that was asked for at ``fps`` and keeps
+    the last ``size`` frames of each. Keywords read the newest frame instead of
+    capturing their own, so concurrent checks share one capture and capture
+    cost leaves the keyword's hot path. The history answers "since when is
+    this on screen" questions.
+    """
+
+    def __init__(self, capture: ScreenCapture, fps: float = 10.0, size: int = 30) -> None:
+        self.capture = capture
+        self.interval = 1.0 / fps
+        self.size = size
+        self._frames: Dict[int, Deque[Frame]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def latest(self, screen: int = 0) -> Frame:
+        """Newest frame of ``screen``; the first request for a screen captures it right away."""
+        with self._lock:
+            frames = self._frames.get(screen)
+            if frames:
+                return frames[-1]
+
+        frame = self.capture.grab(None, screen)
+        with self._lock:
+            frames = self._frames.setdefault(screen, deque(maxlen=self.size))
+            if not frames or frames[-1].timestamp < frame.timestamp:
+                frames.append(frame)
+        self._start()
+        return frame
+
+    def history(self, screen: int = 0) -> List[Frame]:
+        """Buffered frames of ``screen``, newest first."""
+        with self._lock:
+            return list(reversed(self._frames.get(screen, ())))
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(self.interval * 2)
+            self._thread = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name="SikuliPlusCapture", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            with self._lock:
+                screens = list(self._frames)
+            for screen in screens:
+                try:
+                    frame = self.capture.grab(None, screen)
+                except Exception:
+                    # E.g. a monitor was unplugged. Forget the screen, so the next
+                    # keyword that asks for it captures it and sees the error.
+                    with self._lock:
+                        self._frames.pop(screen, None)
+                    continue
+                with self._lock:
+                    self._frames[screen].append(frame)
+
+            # Fixed rate measured from tick starts; skip ticks rather than pile up.
+            next_tick = max(next_tick + self.interval, time.monotonic())
+            self._stopped.wait(next_tick - time.monotonic())
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import mss
+import numpy as np
+
+from .matcher import PreparedImage, Region, build_pyramid
+
+
+# ITU-R BT.601 luma weights, in the BGRA channel order mss returns.
+_LUMA_WEIGHTS = np.array([0.114, 0.587, 0.299, 0.0], dtype=np.float32)
+
+
+@dataclass(frozen=True)
+class Frame:
+    """Grayscale screen pixels plus the screen position of their top-left corner."""
+
+    pixels: np.ndarray
+    x: int = 0
+    y: int = 0
+    screen: int = 0
+    timestamp: float = field(default_factory=time.monotonic)
+    _pyramids: Dict[Tuple[Region, int], List[np.ndarray]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _prepared: PreparedImage = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Created up front, so pool threads matching the same frame share one.
+        object.__setattr__(self, "_prepared", PreparedImage(self.pixels))
+
+    @property
+    def region(self) -> Region:
+        height, width = self.pixels.shape
+        return (self.x, self.y, width, height)
+
+    def crop(self, region: Optional[Region]) -> Frame:
+        """The part of this frame inside ``region`` (screen coordinates)."""
+        if region is None:
+            return self
+        x, y, width, height = region
+        left, top = max(x, self.x), max(y, self.y)
+        right = min(x + width, self.x + self.pixels.shape[1])
+        bottom = min(y + height, self.y + self.pixels.shape[0])
+        if right <= left or bottom <= top:
+            raise ValueError(f"Region {list(region)} is outside screen {self.screen}")
+
+        pixels = self.pixels[top - self.y:bottom - self.y, left - self.x:right - self.x]
+        return Frame(pixels, left, top, self.screen, self.timestamp)
+
+    def pyramid(self, window: Region, levels: int) -> List[np.ndarray]:
+        """Pyramid of a window (frame coordinates), shared by all templates searched in this frame."""
+        key = (window, levels)
+        pyramid = self._pyramids.get(key)
+        if pyramid is None:
+            x, y, width, height = window
+            pyramid = self._pyramids[key] = build_pyramid(self.pixels[y:y + height, x:x + width], levels)
+        return pyramid
+
+    def prepared(self) -> PreparedImage:
+        """The whole frame's spectrum and integral images, shared by all templates searched in it."""
+        return self._prepared
+
+
+def to_grayscale(bgra: np.ndarray) -> np.ndarray:
+    gray = bgra @ _LUMA_WEIGHTS
+    return np.clip(gray, 0, 255, out=gray).astype(np.uint8)
+
+
+class ScreenCapture:
+    """Grabs monitor pixels in-process with ``mss``.
+
+    Screen ids follow Sikuli's numbering: ``0`` is the primary monitor.
+    The recording and replay backends subclass it.
+    """
+
+    def __init__(self) -> None:
+        # mss handles are bound to the thread that created them.
+        self._local = threading.local()
+
+    @property
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def screen_count(self) -> int:
+        return len(self._sct.monitors) - 1
+
+    def screen_region(self, screen: int = 0) -> Region:
+        monitors = self._sct.monitors
+        if not 0 <= screen < len(monitors) - 1:
+            raise ValueError(f"Invalid screen {screen}. Available screens: 0 to {len(monitors) - 2}")
+
+        monitor = monitors[screen + 1]
+        return (monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+
+    def grab(self, region: Optional[Region] = None, screen: int = 0) -> Frame:
+        screen_x, screen_y, screen_width, screen_height = self.screen_region(screen)
+        x, y, width, height = region or (screen_x, screen_y, screen_width, screen_height)
+
+        # Clip to the monitor so an ROI hanging off the edge still grabs.
+        left, top = max(x, screen_x), max(y, screen_y)
+        right = min(x + width, screen_x + screen_width)
+        bottom = min(y + height, screen_y + screen_height)
+        if right <= left or bottom <= top:
+            raise ValueError(f"Region {list(region or ())} is outside screen {screen}")
+
+        shot = self._sct.grab({"left": left, "top": top, "width": right - left, "height": bottom - top})
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        return Frame(to_grayscale(bgra), left, top, screen)
+
+    def mark(self, label: str) -> None:
+        """Called when a keyword starts; recording and replay backends use it to line up time."""
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from .capture import Frame
+from .matcher import Region
+
+
+class ChangeDetector:
+    """Tracks consecutive frames of one wait loop and reports what changed.
+
+    A template that missed on the previous frame can only start matching at a
+    position whose window overlaps changed pixels, so the matcher only needs
+    to look around the dirty rectangle, and not at all when nothing changed.
+    """
+
+    def __init__(self) -> None:
+        self._previous: Optional[Frame] = None
+
+    def update(self, frame: Frame) -> Optional[Region]:
+        """Return the dirty rectangle in frame coordinates, or ``None`` if the frame is unchanged."""
+        previous, self._previous = self._previous, frame
+        height, width = frame.pixels.shape
+
+        if previous is None or previous.region != frame.region or previous.screen != frame.screen:
+            return (0, 0, width, height)
+
+        diff = previous.pixels != frame.pixels
+        rows = np.flatnonzero(diff.any(axis=1))
+        if rows.size == 0:
+            return None
+
+        columns = np.flatnonzero(diff[rows[0]:rows[-1] + 1].any(axis=0))
+        top, bottom = int(rows[0]), int(rows[-1]) + 1
+        left, right = int(columns[0]), int(columns[-1]) + 1
+        return (left, top, right - left, bottom - top)
+
+
+def search_window(shape: tuple, changed: Region, template_shape: tuple) -> Region:
+    """Grow ``changed`` by the template size: every window touching it fits inside."""
+    frame_height, frame_width = shape
+    height, width = template_shape
+    x, y, changed_width, changed_height = changed
+
+    left, top = max(x - width + 1, 0), max(y - height + 1, 0)
+    right = min(x + changed_width + width - 1, frame_width)
+    bottom = min(y + changed_height + height - 1, frame_height)
+    return (left, top, right - left, bottom - top)
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .buffer import FrameBuffer
+from .capture import Frame, ScreenCapture
+from .change import ChangeDetector, search_window
+from .matcher import (
+    MIN_PYRAMID_TEMPLATE,
+    Match,
+    Region,
+    all_matches,
+    best_match,
+    intersect,
+    match_template,
+    pyramid_match,
+)
+from .templates import Template, TemplateCache, template_cache
+
+
+# Scales whose coarse score stays this far below ``similarity`` are not searched at full resolution.
+SCALE_PRUNE_MARGIN = 0.25
+# Halvings used to rank scales; fewer when the scaled template would get too small.
+SCALE_RANK_LEVELS = 2
+
+
+class NativeEngine:
+    """In-process replacement for the Sikuli server's screen search.
+
+    Captures the screen into a NumPy array and runs normalized
+    cross-correlation against the template, so a check costs one capture and
+    one match instead of an XML-RPC round trip into the JVM.
+
+    With ``location_hints`` the engine remembers where each template was last
+    found on each screen and first searches a window ``hint_margin`` pixels
+    around that spot, falling back to the full area on a miss. A hinted hit is
+    any match above ``similarity`` there, not necessarily the best on screen.
+
+    ``pyramid_levels`` above zero searches large areas coarse-to-fine, see
+    ``pyramid_match``; hits and misses stay those of the full-resolution search,
+    the reported location among look-alikes may not.
+
+    ``search_screens`` matches independent templates on a pool of ``workers``
+    threads (``0`` for one per CPU) against the same frames. NumPy releases the
+    GIL inside the FFTs, so the templates are matched on separate cores
+    without copying the frame.
+
+    ``search_any_screen`` stops at the first template that matches. With
+    ``hit_ranking`` templates are tried in order of their recent hit rate, so
+    the likely winner is searched first.
+
+    ``capture_fps`` above zero reads frames from a ``FrameBuffer`` filled in
+    the background instead of capturing on every check, and keeps the recent
+    history that ``appeared_at`` looks through.
+
+    With several ``scales``, one template is matched resized by each of them,
+    for screens at another DPI than the one it was captured at. The scale that
+    last matched on a screen is tried first; the other scales are ranked by
+    their score on a coarse pyramid level, and those scoring far below
+    ``similarity`` there are skipped.
+
+    Wait loops take their time from ``clock`` and ``sleep``, so a replayed
+    recording can run them on a virtual clock.
+    """
+
+    def __init__(
+        self,
+        capture: Optional[ScreenCapture] = None,
+        templates: Optional[TemplateCache] = None,
+        location_hints: bool = True,
+        hint_margin: int = 40,
+        pyramid_levels: int = 0,
+        pyramid_candidates: int = 5,
+        workers: int = 1,
+        hit_ranking: bool = True,
+        capture_fps: float = 0,
+        capture_buffer: int = 30,
+        scales: Sequence[float] = (1.0,),
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.capture = capture or ScreenCapture()
+        self.templates = templates or template_cache
+        self.location_hints = location_hints
+        self.hint_margin = hint_margin
+        self.pyramid_levels = pyramid_levels
+        self.pyramid_candidates = pyramid_candidates
+        self.workers = workers or os.cpu_count() or 1
+        self.hit_ranking = hit_ranking
+        self.buffer = FrameBuffer(self.capture, capture_fps, capture_buffer) if capture_fps > 0 else None
+        self.scales = tuple(scales)
+        self.clock = clock
+        self.sleep = sleep
+        self._last_locations: Dict[Tuple[str, int], Region] = {}
+        self._hit_rates: Dict[str, float] = {}
+        self._screen_scales: Dict[int, float] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def grab(self, region: Optional[Region] = None, screen: int = 0) -> Frame:
+        if self.buffer is not None:
+            latest = self.buffer.latest(screen)
+            if region is None:
+                # A new Frame over the same pixels, so what each search caches on it does not stay in the buffer.
+                return Frame(latest.pixels, latest.x, latest.y, latest.screen, latest.timestamp)
+            return latest.crop(region)
+        return self.capture.grab(region, screen)
+
+    def grab_screens(self, region: Optional[Region], screens: List[int]) -> List[Frame]:
+        """One frame per screen, captured concurrently; with ``region``, screens it misses are skipped."""
+        if len(screens) < 2:
+            return [self.grab(region, screen) for screen in screens]
+
+        def grab(screen: int) -> Optional[Frame]:
+            try:
+                return self.grab(region, screen)
+            except ValueError:
+                if region is None:
+                    raise
+                return None
+
+        frames = [frame for frame in self._map(grab, screens) if frame is not None]
+        if not frames:
+            raise ValueError(f"Region {list(region or ())} is outside screens {screens}")
+        return frames
+
+    def screen_count(self) -> int:
+        return self.capture.screen_count()
+
+    def track_changes(self) -> ChangeDetector:
+        return ChangeDetector()
+
+    def available(self, images: List[str]) -> List[str]:
+        """``images`` whose template can be loaded, from its file or a pack."""
+        loaded = []
+        for image in images:
+            try:
+                self.templates.get(image)
+            except FileNotFoundError:
+                continue
+            loaded.append(image)
+        return loaded
+
+    def search(
+        self, frame: Frame, image: str, similarity: float, changed: Optional[Region] = None
+    ) -> Optional[Match]:
+        """Best match of ``image`` in ``frame``, in screen coordinates.
+
+        ``changed`` (frame coordinates) limits the search to the windows that
+        overlap it, for callers that already know the rest of the frame misses.
+        """
+        template = self.templates.get(image)
+        if len(self.scales) == 1:
+            return self._search_scaled(frame, image, template, self.scales[0], similarity, changed)
+
+        remembered = self._screen_scales.get(frame.screen)
+        if remembered is not None:
+            match = self._search_scaled(frame, image, template, remembered, similarity, changed)
+            if match is not None:
+                return match
+
+        for scale in self._rank_scales(frame, template, similarity, changed, skip=remembered):
+            match = self._search_scaled(frame, image, template, scale, similarity, changed)
+            if match is not None:
+                self._screen_scales[frame.screen] = scale
+                return match
+        return None
+
+    def _search_scaled(
+        self,
+        frame: Frame,
+        image: str,
+        template: Template,
+        scale: float,
+        similarity: float,
+        changed: Optional[Region],
+    ) -> Optional[Match]:
+        template = template.scaled(scale)
+        height, width = frame.pixels.shape
+        bounds = (0, 0, width, height)
+        if changed is not None:
+            bounds = search_window(frame.pixels.shape, changed, template.gray.shape)
+
+        match = None
+        hint = self._hint_window(frame, image, bounds, template.gray.shape)
+        if hint is not None:
+            match = self._search_in(frame, template, similarity, hint, scale)
+        if match is None:
+            match = self._search_in(frame, template, similarity, bounds, scale)
+
+        if match is not None and self.location_hints:
+            self._last_locations[(image, frame.screen)] = match.region
+        return match
+
+    def _rank_scales(
+        self,
+        frame: Frame,
+        template: Template,
+        similarity: float,
+        changed: Optional[Region],
+        skip: Optional[float] = None,
+    ) -> List[float]:
+        """``scales`` other than ``skip``, best coarse score first, without those that cannot reach ``similarity``."""
+        height, width = frame.pixels.shape
+        ranked = []
+        for scale in self.scales:
+            if scale == skip:
+                continue
+            scaled = template.scaled(scale)
+            bounds = (0, 0, width, height)
+            if changed is not None:
+                bounds = search_window(frame.pixels.shape, changed, scaled.gray.shape)
+
+            level = SCALE_RANK_LEVELS
+            while level > 0 and min(scaled.gray.shape) >> level < MIN_PYRAMID_TEMPLATE:
+                level -= 1
+            image_levels = frame.pyramid(bounds, level)
+            if level == 0 or len(image_levels) <= level:
+                ranked.append((float("inf"), scale))  # Too small to rank: search it anyway.
+                continue
+
+            scores = match_template(image_levels[level], scaled.pyramid(level)[level])
+            score = float(scores.max()) if scores.size else -1.0
+            if score >= similarity - SCALE_PRUNE_MARGIN:
+                ranked.append((score, scale))
+
+        return [scale for _, scale in sorted(ranked, key=lambda item: -item[0])]
+
+    def _candidate_scales(self, frame: Frame, template: Template, similarity: float) -> List[float]:
+        """Scales worth trying on ``frame``: the one last matched on its screen first, then the ranked others."""
+        if len(self.scales) == 1:
+            return list(self.scales)
+        remembered = self._screen_scales.get(frame.screen)
+        first = [remembered] if remembered is not None else []
+        return first + self._rank_scales(frame, template, similarity, None, skip=remembered)
+
+    def _hint_window(self, frame: Frame, image: str, bounds: Region, template_shape: tuple) -> Optional[Region]:
+        if not self.location_hints:
+            return None
+
+        last = self._last_locations.get((image, frame.screen))
+        if last is None:
+            return None
+
+        margin = self.hint_margin
+        x, y, width, height = last
+        window = intersect((x - frame.x - margin, y - frame.y - margin, width + 2 * margin, height + 2 * margin), bounds)
+        if window is None or window == bounds:
+            return None
+
+        template_height, template_width = template_shape
+        if window[2] < template_width or window[3] < template_height:
+            return None
+        return window
+
+    def _search_in(
+        self, frame: Frame, template: Template, similarity: float, window: Region, scale: float = 1.0
+    ) -> Optional[Match]:
+        x, y, width, height = window
+        if self.pyramid_levels > 0:
+            match = pyramid_match(
+                frame.pyramid(window, self.pyramid_levels),
+                template.pyramid(self.pyramid_levels),
+                similarity,
+                self.pyramid_candidates,
+            )
+        elif (height, width) == frame.pixels.shape:
+            match = best_match(frame.prepared(), template.gray, similarity)
+        else:
+            match = best_match(frame.pixels[y:y + height, x:x + width], template.gray, similarity)
+        if match is None:
+            return None
+
+        return Match(
+            match.x + x + frame.x, match.y + y + frame.y, match.width, match.height, match.score, frame.screen, scale
+        )
+
+    def search_screens(
+        self, frames: List[Tuple[Frame, Optional[Region]]], images: List[str], similarity: float
+    ) -> Dict[str, Match]:
+        """Images found in any of ``frames`` (one per screen, with its changed area); earlier frames win.
+
+        Missing files are not found.
+        """
+        # Loaded here rather than in the pool, so a missing file is skipped the same way every time.
+        tasks = [(frame, changed, image) for frame, changed in frames for image in self.available(images)]
+        matches = self._map(lambda task: self.search(task[0], task[2], similarity, task[1]), tasks)
+
+        found: Dict[str, Match] = {}
+        for (_, _, image), match in zip(tasks, matches):
+            if match is not None and image not in found:
+                found[image] = match
+        return found
+
+    def search_any_screen(
+        self, frames: List[Tuple[Frame, Optional[Region]]], images: List[str], similarity: float
+    ) -> Optional[Tuple[str, Match]]:
+        """First of ``images`` found in any of ``frames``; the remaining searches are skipped or cancelled.
+
+        Missing files are not found.
+        """
+        # Loaded before any search starts: a missing file raising inside the pool would
+        # only surface if its future completed before a hit, depending on thread timing.
+        images = self.available(self.rank(images))
+        tasks = [(frame, changed, image) for image in images for frame, changed in frames]
+        if self.workers < 2 or len(tasks) < 2:
+            for frame, changed, image in tasks:
+                match = self.search(frame, image, similarity, changed)
+                self._record_hit(image, match is not None)
+                if match is not None:
+                    return image, match
+            return None
+
+        futures = {
+            self._executor().submit(self.search, frame, image, similarity, changed): image
+            for frame, changed, image in tasks
+        }
+        try:
+            for future in as_completed(futures):
+                image, match = futures[future], future.result()
+                self._record_hit(image, match is not None)
+                if match is not None:
+                    return image, match
+        finally:
+            # Searches already running finish on their own; queued ones never start.
+            for future in futures:
+                future.cancel()
+        return None
+
+    def appeared_at(
+        self, image: str, similarity: float, region: Optional[Region] = None, screen: int = 0
+    ) -> Optional[float]:
+        """Timestamp of the oldest buffered frame since which ``image`` is continuously visible.
+
+        ``None`` when the newest frame does not show it.
+        """
+        if self.buffer is None:
+            raise RuntimeError("Frame history needs capture_fps > 0")
+
+        template = self.templates.get(image)
+        since = None
+        for frame in self.buffer.history(screen):
+            try:
+                view = frame.crop(region)
+            except ValueError:
+                break
+            height, width = view.pixels.shape
+            if since is None:
+                # Newest frame: pick the scale it shows, as ``search`` would.
+                for scale in self._candidate_scales(view, template, similarity):
+                    if self._search_in(view, template.scaled(scale), similarity, (0, 0, width, height)):
+                        template = template.scaled(scale)
+                        self._screen_scales[screen] = scale
+                        break
+                else:
+                    break
+            elif self._search_in(view, template, similarity, (0, 0, width, height)) is None:
+                break
+            since = frame.timestamp
+        return since
+
+    def rank(self, images: List[str]) -> List[str]:
+        """``images`` by recent hit rate, most likely first; ties keep their order."""
+        if not self.hit_ranking:
+            return list(images)
+        return sorted(images, key=lambda image: -self._hit_rates.get(image, 0.0))
+
+    def _record_hit(self, image: str, hit: bool, weight: float = 0.2) -> None:
+        # Exponential moving average, so the ranking follows what the suite shows lately.
+        if self.hit_ranking:
+            rate = self._hit_rates.get(image, 0.0)
+            self._hit_rates[image] = rate + weight * (hit - rate)
+
+    def search_all(self, frame: Frame, image: str, similarity: float) -> List[Match]:
+        """Every occurrence of ``image`` in ``frame``, best first, in screen coordinates.
+
+        Uses the first scale, in ``search`` order, at which ``image`` occurs at all.
+        """
+        template = self.templates.get(image)
+        for scale in self._candidate_scales(frame, template, similarity):
+            found = all_matches(frame.prepared(), template.scaled(scale).gray, similarity)
+            if found:
+                if len(self.scales) > 1:
+                    self._screen_scales[frame.screen] = scale
+                return [
+                    Match(
+                        match.x + frame.x, match.y + frame.y, match.width, match.height, match.score, frame.screen, scale
+                    )
+                    for match in found
+                ]
+        return []
+
+    def search_all_many(self, frame: Frame, images: List[str], similarity: float) -> Dict[str, List[Match]]:
+        """``search_all`` for several templates against one frame; missing files have no matches."""
+        loaded = self.available(images)
+        matches = self._map(lambda image: self.search_all(frame, image, similarity), loaded)
+        return {image: [] for image in images} | dict(zip(loaded, matches))
+
+    def _map(self, function, items: list) -> list:
+        if self.workers < 2 or len(items) < 2:
+            return [function(item) for item in items]
+        return list(self._executor().map(function, items))
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Created on first use and kept for the engine's lifetime.
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="SikuliPlusMatch")
+        return self._pool
+
+    def close(self) -> None:
+        if self.buffer is not None:
+            self.buffer.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.capture.close()
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+
+Region = Tuple[int, int, int, int]
+
+# Windows flatter than this (per-pixel variance) carry no pattern to correlate
+# against, and rounding noise in the integral images would dominate their score.
+MIN_WINDOW_VARIANCE = 1e-2
+
+# Coarse pyramid levels stop before the template shrinks below this many pixels.
+MIN_PYRAMID_TEMPLATE = 8
+
+
+@dataclass(frozen=True)
+class Match:
+    x: int
+    y: int
+    width: int
+    height: int
+    score: float
+    screen: int = 0
+    scale: float = 1.0
+
+    @property
+    def region(self) -> Region:
+        return (self.x, self.y, self.width, self.height)
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return (self.x + self.width // 2, self.y + self.height // 2)
+
+
+def _fast_length(n: int) -> int:
+    """Smallest 5-smooth number >= n, the sizes the FFT handles fastest."""
+    best = 1 << (n - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            candidate = p35
+            while candidate < n:
+                candidate *= 2
+            best = min(best, candidate)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _integral(values: np.ndarray) -> np.ndarray:
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+    return integral
+
+
+def _window_sums(integral: np.ndarray, height: int, width: int) -> np.ndarray:
+    return (
+        integral[height:, width:]
+        - integral[:-height, width:]
+        - integral[height:, :-width]
+        + integral[:-height, :-width]
+    )
+
+
+class PreparedImage:
+    """An image to search, with the parts of ``match_template`` that only depend on it.
+
+    The spectrum (its FFT size comes from the image alone) and the integral
+    images of the pixels and their squares are computed on first use and
+    reused by every template matched against the same image, also from
+    several threads at once.
+    """
+
+    def __init__(self, image: np.ndarray) -> None:
+        self.image = image
+        self.shape: Tuple[int, int] = image.shape
+        self.fft_shape = (_fast_length(self.shape[0]), _fast_length(self.shape[1]))
+        self._spectrum: Optional[np.ndarray] = None
+        self._integrals: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._spectrum_lock = threading.Lock()
+        self._integrals_lock = threading.Lock()
+
+    def spectrum(self) -> np.ndarray:
+        with self._spectrum_lock:
+            if self._spectrum is None:
+                self._spectrum = np.fft.rfft2(self.image.astype(np.float32, copy=False), self.fft_shape)
+            return self._spectrum
+
+    def integrals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Integral images of the pixels and of their squares."""
+        with self._integrals_lock:
+            if self._integrals is None:
+                pixels = self.image.astype(np.float32, copy=False)
+                self._integrals = (_integral(pixels), _integral(np.square(pixels, dtype=np.float64)))
+            return self._integrals
+
+
+def match_template(image: Union[np.ndarray, PreparedImage], template: np.ndarray) -> np.ndarray:
+    """Zero-mean normalized cross-correlation of ``template`` over ``image``.
+
+    Both arrays are 2D grayscale; pass a ``PreparedImage`` to share the
+    image's part of the work between templates. The result has one score in
+    [-1, 1] per template position, i.e. shape ``(H - h + 1, W - w + 1)``.
+    """
+    prepared = image if isinstance(image, PreparedImage) else PreparedImage(image)
+    image_height, image_width = prepared.shape
+    height, width = template.shape
+    if height > image_height or width > image_width:
+        return np.empty((0, 0), dtype=np.float32)
+
+    template = template.astype(np.float32, copy=False)
+
+    centered = template - template.mean()
+    template_energy = float(np.square(centered, dtype=np.float64).sum())
+
+    shape = prepared.fft_shape
+    spectrum = prepared.spectrum() * np.fft.rfft2(centered[::-1, ::-1], shape)
+    correlation = np.fft.irfft2(spectrum, shape)[height - 1:image_height, width - 1:image_width]
+
+    integral, squared_integral = prepared.integrals()
+    sums = _window_sums(integral, height, width)
+    squares = _window_sums(squared_integral, height, width)
+    window_energy = squares - np.square(sums) / (height * width)
+
+    denominator = np.sqrt(np.maximum(window_energy, 0.0) * template_energy)
+    textured = window_energy > MIN_WINDOW_VARIANCE * height * width
+    scores = np.zeros(correlation.shape, dtype=np.float32)
+    np.divide(correlation, denominator, out=scores, where=textured & (denominator > 0))
+    return np.clip(scores, -1.0, 1.0, out=scores)
+
+
+def best_match(
+    image: Union[np.ndarray, PreparedImage], template: np.ndarray, similarity: float
+) -> Optional[Match]:
+    scores = match_template(image, template)
+    if scores.size == 0:
+        return None
+
+    y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    score = float(scores[y, x])
+    if score < similarity:
+        return None
+
+    height, width = template.shape
+    return Match(int(x), int(y), width, height, score)
+
+
+def all_matches(
+    image: Union[np.ndarray, PreparedImage], template: np.ndarray, similarity: float, max_overlap: float = 0.5
+) -> List[Match]:
+    """Every occurrence of ``template`` scoring at least ``similarity``, best first.
+
+    Candidates are the local maxima of the score map above the threshold.
+    Greedy non-maximum suppression then keeps the best remaining candidate
+    and drops, in one vectorized step, all candidates whose rectangle
+    overlaps it by more than ``max_overlap`` (intersection over union).
+    """
+    scores = match_template(image, template)
+    if scores.size == 0:
+        return []
+
+    # 3x3 local maxima, so a plateau of near-identical positions yields one candidate.
+    padded = np.pad(scores, 1, constant_values=-np.inf)
+    rows, columns = scores.shape
+    neighbourhood = np.max(
+        [padded[dy:dy + rows, dx:dx + columns] for dy in range(3) for dx in range(3)], axis=0
+    )
+    ys, xs = np.nonzero((scores >= similarity) & (scores >= neighbourhood))
+    if ys.size == 0:
+        return []
+
+    candidate_scores = scores[ys, xs]
+    order = np.argsort(-candidate_scores, kind="stable")
+    ys, xs, candidate_scores = ys[order], xs[order], candidate_scores[order]
+
+    height, width = template.shape
+    area = height * width
+    keep = []
+    alive = np.ones(ys.size, dtype=bool)
+    for index in range(ys.size):
+        if not alive[index]:
+            continue
+        keep.append(index)
+        overlap_x = np.clip(width - np.abs(xs - xs[index]), 0, None)
+        overlap_y = np.clip(height - np.abs(ys - ys[index]), 0, None)
+        intersection = overlap_x * overlap_y
+        alive &= intersection <= max_overlap * (2 * area - intersection)
+
+    return [Match(int(xs[i]), int(ys[i]), width, height, float(candidate_scores[i])) for i in keep]
+
+
+def downsample(image: np.ndarray) -> np.ndarray:
+    """Halve both dimensions by averaging 2x2 blocks (odd edges are dropped)."""
+    height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    blocks = image[:height, :width].reshape(height // 2, 2, width // 2, 2)
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(image.dtype)
+
+
+def intersect(first: Region, second: Region) -> Optional[Region]:
+    left, top = max(first[0], second[0]), max(first[1], second[1])
+    right = min(first[0] + first[2], second[0] + second[2])
+    bottom = min(first[1] + first[3], second[1] + second[3])
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right - left, bottom - top)
+
+
+def build_pyramid(image: np.ndarray, levels: int) -> List[np.ndarray]:
+    pyramid = [image]
+    while len(pyramid) <= levels and min(pyramid[-1].shape) >= 2:
+        pyramid.append(downsample(pyramid[-1]))
+    return pyramid
+
+
+def _top_candidates(scores: np.ndarray, count: int, radius: Tuple[int, int]) -> List[Tuple[int, int]]:
+    scores = scores.copy()
+    radius_y, radius_x = radius
+    candidates = []
+    for _ in range(count):
+        y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        if not np.isfinite(scores[y, x]):
+            break
+        candidates.append((int(y), int(x)))
+        scores[max(y - radius_y, 0):y + radius_y + 1, max(x - radius_x, 0):x + radius_x + 1] = -np.inf
+    return candidates
+
+
+def pyramid_match(
+    image_levels: List[np.ndarray],
+    template_levels: List[np.ndarray],
+    similarity: float,
+    candidates: int = 5,
+) -> Optional[Match]:
+    """Coarse-to-fine search that hits and misses exactly when ``best_match`` on level 0 does.
+
+    The ``candidates`` best positions on the coarsest level are re-scored at
+    full resolution in a window one coarse pixel around them. Full-resolution
+    scores decide every hit, and when no candidate reaches ``similarity`` the
+    full-resolution search runs before reporting a miss, so an image is found
+    exactly when ``best_match`` would find it.
+
+    The location is not guaranteed to be ``best_match``'s: a hit returns the
+    best of the re-scored candidates, which can be another spot above
+    ``similarity`` when the screen holds more look-alikes than ``candidates``
+    (table rows, icons in a list). A miss costs the coarse pass on top of the
+    full search.
+    """
+    image, template = image_levels[0], template_levels[0]
+    level = min(len(image_levels), len(template_levels)) - 1
+    while level > 0 and min(template_levels[level].shape) < MIN_PYRAMID_TEMPLATE:
+        level -= 1
+    if level == 0:
+        return best_match(image, template, similarity)
+
+    coarse = match_template(image_levels[level], template_levels[level])
+    if coarse.size == 0:
+        return best_match(image, template, similarity)
+
+    scale = 2 ** level
+    height, width = template.shape
+    image_height, image_width = image.shape
+    coarse_height, coarse_width = template_levels[level].shape
+
+    best: Optional[Match] = None
+    for coarse_y, coarse_x in _top_candidates(coarse, candidates, (coarse_height // 2, coarse_width // 2)):
+        left, top = max(coarse_x * scale - scale, 0), max(coarse_y * scale - scale, 0)
+        right = min(coarse_x * scale + width + scale, image_width)
+        bottom = min(coarse_y * scale + height + scale, image_height)
+        match = best_match(image[top:bottom, left:right], template, similarity)
+        if match is not None and (best is None or match.score > best.score):
+            best = Match(match.x + left, match.y + top, width, height, match.score)
+
+    if best is not None:
+        return best
+    return best_match(image, template, similarity)
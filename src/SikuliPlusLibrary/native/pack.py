@@ -0,0 +1,155 @@
+"""Template packs: many template images pre-decoded into one memory-mapped file.
+
+Build one next to the images, then point ``template_pack`` at it::
+
+    python -m SikuliPlusLibrary.native.pack tests/robot/images
+
+Templates are looked up by their path relative to the pack's root, the
+directory the pack was built from. Pixels are served straight from the
+mapping, so loading a template copies nothing, and parallel robot or pabot
+processes share one copy through the page cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .templates import Template, decode
+
+
+MAGIC = b"SPPACK1\n"
+ALIGNMENT = 64
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg", "*.bmp")
+DEFAULT_NAME = "templates.sppack"
+_INDEX_SIZE = struct.Struct("<Q")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _checksum(path: str) -> int:
+    with open(path, "rb") as file:
+        return zlib.crc32(file.read())
+
+
+def build_pack(root: str, output: Optional[str] = None, patterns: Iterable[str] = IMAGE_PATTERNS) -> str:
+    """Decode every image under ``root`` into a pack file; returns its path."""
+    root_path = Path(root).resolve()
+    output_path = Path(output) if output else root_path / DEFAULT_NAME
+    images = sorted({path for pattern in patterns for path in root_path.rglob(pattern)})
+
+    entries: Dict[str, dict] = {}
+    arrays = []
+    offset = 0
+    for image in images:
+        gray = decode(str(image))
+        stat = image.stat()
+        entries[image.relative_to(root_path).as_posix()] = {
+            "offset": offset,
+            "shape": list(gray.shape),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "crc32": _checksum(str(image)),
+        }
+        arrays.append(gray)
+        offset = _aligned(offset + gray.nbytes)
+
+    # The root is kept relative to the pack, so the pair can be moved or checked out elsewhere.
+    relative_root = os.path.relpath(root_path, output_path.resolve().parent)
+    index = json.dumps({"root": Path(relative_root).as_posix(), "templates": entries}).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + _INDEX_SIZE.size + len(index))
+    with open(output_path, "wb") as file:
+        file.write(MAGIC + _INDEX_SIZE.pack(len(index)) + index)
+        for entry, gray in zip(entries.values(), arrays):
+            file.seek(data_start + entry["offset"])
+            file.write(np.ascontiguousarray(gray).tobytes())
+    return str(output_path)
+
+
+class TemplatePack:
+    """Read side of ``build_pack``.
+
+    A packed template is used only while its source image is missing or
+    unchanged, so an edited image is decoded from disk until the pack is
+    rebuilt. Unchanged means the size and mtime recorded at build time; only
+    when the mtime differs, as after a fresh checkout, is the file read
+    to compare its CRC, which costs about as much as decoding it.
+    """
+
+    def __init__(self, path: str, root: Optional[str] = None) -> None:
+        self.path = os.path.abspath(path)
+        with open(self.path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"'{path}' is not a template pack")
+        (index_size,) = _INDEX_SIZE.unpack_from(self._map, len(MAGIC))
+        index_start = len(MAGIC) + _INDEX_SIZE.size
+        index = json.loads(self._map[index_start:index_start + index_size])
+        self._data_start = _aligned(index_start + index_size)
+        self._entries: Dict[str, dict] = index["templates"]
+        self.root = os.path.abspath(root or os.path.join(os.path.dirname(self.path), index.get("root", ".")))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, str) and self._key(path) is not None
+
+    def lookup(self, path: str, version: Optional[Tuple[int, int]] = None) -> Optional[Template]:
+        """The packed template for ``path``; ``version`` is the source file's ``(mtime_ns, size)``, ``None`` if missing."""
+        key = self._key(path)
+        if key is None:
+            return None
+
+        entry = self._entries[key]
+        if version is not None and version != (entry.get("mtime_ns"), entry["size"]):
+            if version[1] != entry["size"] or _checksum(path) != entry["crc32"]:
+                return None  # Edited since the pack was built.
+
+        height, width = entry["shape"]
+        gray = np.frombuffer(
+            self._map, dtype=np.uint8, count=height * width, offset=self._data_start + entry["offset"]
+        ).reshape(height, width)
+        return Template(path, gray, mapped=True)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _key(self, path: str) -> Optional[str]:
+        try:
+            relative = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        except ValueError:
+            relative = None  # On another Windows drive.
+        if relative in self._entries:
+            return relative
+        # Also accept a path already relative to the root, whatever the working directory.
+        given = path.replace("\\", "/")
+        return given if given in self._entries else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a template pack from the images under a directory.")
+    parser.add_argument("root", help="directory whose images are packed; lookups are relative to it")
+    parser.add_argument("-o", "--output", help=f"pack file to write (default ROOT/{DEFAULT_NAME})")
+    args = parser.parse_args()
+
+    output = build_pack(args.root, args.output)
+    pack = TemplatePack(output)
+    print(f"{len(pack)} templates packed into {output}")
+    pack.close()
+
+
+if __name__ == "__main__":
+    main()
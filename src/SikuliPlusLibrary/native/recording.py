@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import bisect
+import mmap
+import struct
+import threading
+import time
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .capture import Frame, ScreenCapture
+from .change import ChangeDetector
+from .matcher import Region
+
+
+MAGIC = b"SPREC1\n"
+KEYFRAME, DELTA, MARKER = 0, 1, 2
+# timestamp, kind, screen, screen x, screen y, screen width, screen height,
+# changed x, changed y, changed width, changed height, payload size
+_RECORD = struct.Struct("<dBhiiHHHHHHI")
+
+
+class FrameRecorder(ScreenCapture):
+    """Captures through ``capture`` and appends every full-screen frame to ``path``.
+
+    Frames are stored as deltas: only the rectangle that changed since the
+    previous frame of the same screen, XORed with the old pixels and
+    compressed, so static parts of the screen cost nothing. Unchanged frames
+    are not stored at all. Every ``keyframe_interval`` stored frames, a whole
+    frame is written so replay can seek without decoding from the start.
+    ``mark`` records where each keyword started.
+    """
+
+    def __init__(self, capture: ScreenCapture, path: str, keyframe_interval: int = 50) -> None:
+        super().__init__()
+        self.capture = capture
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(MAGIC)
+        self._detectors: Dict[int, ChangeDetector] = {}
+        self._since_keyframe: Dict[int, int] = {}
+        self._previous: Dict[int, Frame] = {}
+        self._lock = threading.Lock()
+
+    def screen_count(self) -> int:
+        return self.capture.screen_count()
+
+    def screen_region(self, screen: int = 0) -> Region:
+        return self.capture.screen_region(screen)
+
+    def grab(self, region: Optional[Region] = None, screen: int = 0) -> Frame:
+        # Whole screens are recorded, so replay can serve any later ROI.
+        frame = self.capture.grab(None, screen)
+        self._record(frame)
+        return frame.crop(region)
+
+    def mark(self, label: str) -> None:
+        payload = label.encode("utf-8")
+        with self._lock:
+            self._write(_RECORD.pack(time.monotonic(), MARKER, -1, 0, 0, 0, 0, 0, 0, 0, 0, len(payload)), payload)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.capture.close()
+
+    def _record(self, frame: Frame) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            screen = frame.screen
+            detector = self._detectors.setdefault(screen, ChangeDetector())
+            changed = detector.update(frame)
+            if changed is None:
+                return
+
+            height, width = frame.pixels.shape
+            previous = self._previous.get(screen)
+            count = self._since_keyframe.get(screen, 0)
+            if previous is None or previous.region != frame.region or count >= self.keyframe_interval:
+                kind, changed, pixels = KEYFRAME, (0, 0, width, height), frame.pixels
+                self._since_keyframe[screen] = 1
+            else:
+                x, y, changed_width, changed_height = changed
+                window = (slice(y, y + changed_height), slice(x, x + changed_width))
+                kind, pixels = DELTA, frame.pixels[window] ^ previous.pixels[window]
+                self._since_keyframe[screen] = count + 1
+            self._previous[screen] = frame
+
+            payload = zlib.compress(np.ascontiguousarray(pixels).tobytes(), 1)
+            header = _RECORD.pack(
+                frame.timestamp, kind, screen, frame.x, frame.y, width, height, *changed, len(payload)
+            )
+            self._write(header, payload)
+
+    def _write(self, header: bytes, payload: bytes) -> None:
+        self._file.write(header)
+        self._file.write(payload)
+        # Readable while the suite still runs, and complete if the run crashes.
+        self._file.flush()
+
+
+class Recording:
+    """Read side of a ``FrameRecorder`` file, memory-mapped and decoded on demand."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"'{path}' is not a screen recording")
+
+        # Per screen: timestamps and (offset, header) of every stored frame.
+        self._timestamps: Dict[int, List[float]] = {}
+        self._records: Dict[int, List[Tuple[int, tuple]]] = {}
+        self.markers: List[Tuple[float, str]] = []
+        self._decoded: Dict[int, Tuple[int, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._index()
+
+    @property
+    def screens(self) -> List[int]:
+        return sorted(self._records)
+
+    @property
+    def start(self) -> float:
+        first = [timestamps[0] for timestamps in self._timestamps.values()]
+        first += [timestamp for timestamp, _ in self.markers[:1]]
+        return min(first, default=0.0)
+
+    def frame_at(self, screen: int, timestamp: float) -> Frame:
+        """The frame of ``screen`` that was on screen at ``timestamp``, or the first one before that."""
+        records = self._records.get(screen)
+        if not records:
+            raise ValueError(f"Screen {screen} is not in the recording '{self.path}'")
+
+        index = max(bisect.bisect_right(self._timestamps[screen], timestamp) - 1, 0)
+        with self._lock:
+            pixels = self._decode(screen, index)
+        header = records[index][1]
+        return Frame(pixels.copy(), header[3], header[4], screen, header[0])
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _index(self) -> None:
+        offset, size = len(MAGIC), len(self._map)
+        while offset + _RECORD.size <= size:
+            header = _RECORD.unpack_from(self._map, offset)
+            payload_offset = offset + _RECORD.size
+            if payload_offset + header[-1] > size:
+                break  # Cut short by a crash: keep what is complete.
+
+            timestamp, kind, screen = header[:3]
+            if kind == MARKER:
+                label = bytes(self._map[payload_offset:payload_offset + header[-1]]).decode("utf-8")
+                self.markers.append((timestamp, label))
+            else:
+                self._timestamps.setdefault(screen, []).append(timestamp)
+                self._records.setdefault(screen, []).append((payload_offset, header))
+            offset = payload_offset + header[-1]
+
+    def _decode(self, screen: int, index: int) -> np.ndarray:
+        records = self._records[screen]
+        start = index
+        while records[start][1][1] != KEYFRAME:
+            start -= 1
+
+        # Replay mostly moves forward: continue from the last decoded frame when possible.
+        decoded_index, pixels = self._decoded.get(screen, (-1, None))
+        if not start <= decoded_index <= index:
+            decoded_index, pixels = start, self._payload(*records[start]).copy()
+
+        for offset, header in records[decoded_index + 1:index + 1]:
+            x, y, width, height = header[7:11]
+            pixels[y:y + height, x:x + width] ^= self._payload(offset, header)
+        self._decoded[screen] = (index, pixels)
+        return pixels
+
+    def _payload(self, offset: int, header: tuple) -> np.ndarray:
+        width, height, size = header[9], header[10], header[-1]
+        data = zlib.decompress(self._map[offset:offset + size])
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width)
+
+
+class VirtualClock:
+    """Monotonic clock whose ``sleep`` returns at once and moves time forward instead."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += max(seconds, 0.0)
+
+    def advance_to(self, timestamp: float) -> None:
+        self.now = max(self.now, timestamp)
+
+
+class ReplayCapture(ScreenCapture):
+    """Serves the frames of a ``Recording`` as if they were the live screen.
+
+    Time comes from ``clock``: wait loops sleep on it, so a replayed suite
+    runs as fast as matching allows, and each keyword sees the frames that
+    were on screen when the recorded keyword ran, because ``mark`` moves the
+    clock to where that keyword started in the recording.
+    """
+
+    def __init__(self, recording: Recording, clock: Optional[VirtualClock] = None) -> None:
+        super().__init__()
+        self.recording = recording
+        self.clock = clock or VirtualClock(recording.start)
+        self._next_marker = 0
+
+    def screen_count(self) -> int:
+        return len(self.recording.screens)
+
+    def screen_region(self, screen: int = 0) -> Region:
+        return self.recording.frame_at(screen, self.clock.monotonic()).region
+
+    def grab(self, region: Optional[Region] = None, screen: int = 0) -> Frame:
+        return self.recording.frame_at(screen, self.clock.monotonic()).crop(region)
+
+    def mark(self, label: str) -> None:
+        markers = self.recording.markers
+        for index in range(self._next_marker, len(markers)):
+            timestamp, recorded = markers[index]
+            if recorded == label:
+                self._next_marker = index + 1
+                self.clock.advance_to(timestamp)
+                return
+
+    def close(self) -> None:
+        self.recording.close()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .matcher import build_pyramid
+
+if TYPE_CHECKING:
+    from .pack import TemplatePack
+
+
+class Template:
+    """A decoded grayscale template plus the derived arrays the matcher uses.
+
+    ``mapped`` templates share their pixels with a memory-mapped template
+    pack, so only the derived arrays count as memory of their own.
+    """
+
+    def __init__(self, path: str, gray: np.ndarray, mapped: bool = False) -> None:
+        self.path = path
+        self.gray = gray
+        self.mapped = mapped
+        self._pyramid: List[np.ndarray] = [self.gray]
+        self._scaled: Dict[float, Template] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> Template:
+        return cls(path, decode(path))
+
+    def pyramid(self, levels: int) -> List[np.ndarray]:
+        """Grayscale versions at full, 1/2, 1/4... scale, ``levels + 1`` in total."""
+        with self._lock:
+            if len(self._pyramid) <= levels and min(self._pyramid[-1].shape) >= 2:
+                self._pyramid = build_pyramid(self.gray, levels)
+            return self._pyramid[:levels + 1]
+
+    def scaled(self, scale: float) -> Template:
+        """This template resized by ``scale``, e.g. 1.25 for a screen at 125% of the capture's DPI."""
+        if scale == 1.0:
+            return self
+        with self._lock:
+            scaled = self._scaled.get(scale)
+            if scaled is None:
+                height, width = self.gray.shape
+                size = (max(round(width * scale), 1), max(round(height * scale), 1))
+                resized = Image.fromarray(self.gray).resize(size, Image.Resampling.BICUBIC)
+                scaled = self._scaled[scale] = Template(self.path, np.asarray(resized, dtype=np.uint8))
+            return scaled
+
+    @property
+    def nbytes(self) -> int:
+        # Copied under the lock: pool threads may be adding levels or scales meanwhile.
+        with self._lock:
+            levels = self._pyramid[1:] if self.mapped else list(self._pyramid)
+            scaled = list(self._scaled.values())
+        return sum(level.nbytes for level in levels) + sum(template.nbytes for template in scaled)
+
+
+def decode(path: str) -> np.ndarray:
+    """Grayscale pixels of an image file, as the matcher compares them."""
+    try:
+        with Image.open(path) as image:
+            return np.asarray(image.convert("RGB").convert("L"), dtype=np.uint8)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Image file not found: '{path}'") from None
+
+
+class TemplateCache:
+    """Process-wide LRU of decoded templates, bounded by a byte budget.
+
+    Entries are keyed by absolute path and validated against the file's
+    mtime and size on every lookup, so an edited image is reloaded.
+    Templates in an added pack are loaded from it instead of decoded.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pack_hits = 0
+        self.decodes = 0
+        self._entries: OrderedDict[str, Tuple[Tuple[int, int], Template, int]] = OrderedDict()
+        self._bytes = 0
+        self._packs: List[TemplatePack] = []
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Template:
+        key = os.path.abspath(path)
+        try:
+            stat = os.stat(key)
+            version: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            # Fine if a pack has it: packs can ship without the images.
+            version = None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                template = entry[1]
+                # Pyramid levels are built lazily, so re-account the size.
+                self._bytes += template.nbytes - entry[2]
+                self._entries[key] = (version, template, template.nbytes)
+                self._evict()
+                return template
+
+        template = self._load(path, key, version)
+
+        with self._lock:
+            self.misses += 1
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (version, template, template.nbytes)
+            self._bytes += template.nbytes
+            self._evict()
+        return template
+
+    def add_pack(self, pack: TemplatePack) -> None:
+        with self._lock:
+            if all(added.path != pack.path for added in self._packs):
+                self._packs.append(pack)
+                # Decoded copies of packed templates would shadow the mapping.
+                self._entries.clear()
+                self._bytes = 0
+
+    def _load(self, path: str, key: str, version: Optional[Tuple[int, int]]) -> Template:
+        for pack in self._packs:
+            template = pack.lookup(path, version)
+            if template is not None:
+                with self._lock:
+                    self.pack_hits += 1
+                return template
+
+        if version is None:
+            raise FileNotFoundError(f"Image file not found: '{path}'")
+        template = Template.from_file(key)
+        with self._lock:
+            self.decodes += 1
+        return template
+
+    def _evict(self) -> None:
+        # The most recent entry always stays, even if it alone exceeds the budget.
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.pack_hits = self.decodes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "pack_hits": self.pack_hits,
+                "decodes": self.decodes,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+template_cache = TemplateCache()
+
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config import Config
+
+
+class PollingScheduler:
+    """Paces the checks of a wait loop.
+
+    The first check runs immediately, then checks follow ``interval`` apart,
+    growing by ``backoff`` after every miss up to ``max_interval``. Intervals
+    are measured from the start of the previous check, so slow checks do not
+    stretch the cadence, and the last check always lands on the deadline.
+
+    Usage::
+
+        for attempt in PollingScheduler(timeout):
+            if found():
+                return
+        raise TimeoutError
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        interval: float = 0.05,
+        max_interval: float = 1.0,
+        backoff: float = 1.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.timeout = max(float(timeout), 0.0)
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = max(backoff, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+
+    @classmethod
+    def from_config(cls, timeout: float, config: Config, **kwargs) -> PollingScheduler:
+        return cls(
+            timeout,
+            interval=config.polling_interval,
+            max_interval=config.polling_max_interval,
+            backoff=config.polling_backoff,
+            **kwargs,
+        )
+
+    def __iter__(self) -> Iterator[int]:
+        started = self.clock()
+        deadline = started + self.timeout
+        delay = self.interval
+        attempt = 0
+
+        while True:
+            yield attempt
+            attempt += 1
+
+            if started >= deadline:
+                return
+
+            started = min(started + delay, deadline)
+            remaining = started - self.clock()
+            if remaining > 0:
+                self.sleep(remaining)
+            else:
+                # The check overran its slot: poll again right away.
+                started = min(self.clock(), deadline)
+
+            delay = min(delay * self.backoff, self.max_interval)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import sys
+import threading
+import xmlrpc.client
+from typing import Any, List, Optional, Sequence, Tuple
+
+from robot.api import logger
+from robot.errors import RemoteError
+from robot.libraries.Remote import ArgumentCoercer, RemoteResult
+from SikuliLibrary import SikuliLibrary
+
+from .stats import stats
+
+
+class DeferredKeywordError(Exception):
+    """A deferred primitive that the rest of its batch depended on failed."""
+
+
+class PendingResult:
+    """Return value of a deferred primitive, available once its batch was sent."""
+
+    def __init__(self, channel: CommandChannel, fatal: bool = False) -> None:
+        self._channel = channel
+        self.fatal = fatal
+        self._done = False
+        self._failed = False
+        self._value: Any = None
+
+    def result(self) -> Any:
+        if not self._done:
+            self._channel.flush()
+        return self._value
+
+    @property
+    def failed(self) -> bool:
+        return self._failed
+
+    def _set(self, value: Any, failed: bool = False) -> None:
+        self._value = value
+        self._failed = failed
+        self._done = True
+
+
+class CommandChannel:
+    """Batched, persistent XML-RPC channel to the Sikuli server.
+
+    ``SikuliLibrary.run_keyword`` opens a new HTTP connection per primitive.
+    The channel keeps one connection alive and lets callers ``defer``
+    primitives whose outcome is not needed right away (restoring similarity,
+    resetting the ROI, clearing highlights...). Deferred primitives are sent
+    together with the next ``run_keyword`` in a single ``system.multicall``
+    round trip, or one by one over the same connection if the server does not
+    support multicall.
+
+    A failed deferred primitive is only logged, unless it was deferred as
+    ``fatal``: state the following primitives rely on (similarity, ROI,
+    screen). Then the call that sent it raises, because everything after it
+    in the batch ran with the wrong settings.
+    """
+
+    def __init__(self, sikuli: SikuliLibrary) -> None:
+        self.sikuli = sikuli
+        self._proxy: Optional[xmlrpc.client.ServerProxy] = None
+        self._port: Optional[int] = None
+        self._queue: List[Tuple[str, list, PendingResult]] = []
+        self._multicall_supported = True
+        self._coercer = ArgumentCoercer()
+        self._lock = threading.RLock()
+
+    def run_keyword(self, name: str, args: Optional[list] = None, then: Sequence[Tuple[str, list]] = ()) -> Any:
+        """Run a primitive now, sending any deferred ones in the same round trip.
+
+        ``then`` primitives ride after it in that round trip, e.g. highlighting
+        what it waited for. Their failures are logged, unless the primitive
+        itself failed: then they were bound to fail too.
+        """
+        with self._lock:
+            pending = self.defer(name, args)
+            for follower, follower_args in then:
+                self.defer(follower, follower_args)
+            failure = self._send(raise_for=pending)
+            if failure is not None:
+                raise failure
+            return pending.result()
+
+    def defer(self, name: str, args: Optional[list] = None, fatal: bool = False) -> PendingResult:
+        """Queue a primitive for the next round trip. Failures are logged, or raised when ``fatal``."""
+        pending = PendingResult(self, fatal)
+        with self._lock:
+            self._queue.append((name, self._coercer.coerce(list(args or [])), pending))
+        return pending
+
+    def flush(self) -> None:
+        with self._lock:
+            failure = self._send()
+            if failure is not None:
+                raise failure
+
+    def reset(self) -> None:
+        """Forget the connection and pending primitives, e.g. after a server restart."""
+        with self._lock:
+            self._proxy = None
+            self._port = None
+            self._queue.clear()
+
+    def _server(self) -> xmlrpc.client.ServerProxy:
+        port = self.sikuli.port
+        if port is None:
+            raise RuntimeError("Sikuli server is not running")
+
+        if self._proxy is None or self._port != port:
+            self._proxy = xmlrpc.client.ServerProxy(
+                f"http://127.0.0.1:{port}/", encoding="UTF-8", use_builtin_types=True
+            )
+            self._port = port
+        return self._proxy
+
+    def _send(self, raise_for: Optional[PendingResult] = None) -> Optional[Exception]:
+        if not self._queue:
+            return None
+
+        batch, self._queue = self._queue, []
+        server = self._server()
+
+        with stats.phase("rpc"):
+            responses = None
+            if self._multicall_supported and len(batch) > 1:
+                responses = self._multicall(server, batch)
+                stats.count("rpc_round_trips")
+            if responses is None:
+                responses = [self._call(server, name, args) for name, args, _ in batch]
+                stats.count("rpc_round_trips", len(batch))
+        stats.count("rpc_primitives", len(batch))
+
+        failure = fatal = None
+        for (name, _, pending), response in zip(batch, responses):
+            error = self._apply(name, response, pending)
+            if error is None or failure is not None:
+                continue
+            if pending.fatal:
+                if fatal is None:
+                    fatal = DeferredKeywordError(f"Sikuli keyword '{name}' failed: {error}")
+                    fatal.__cause__ = error
+            elif pending is raise_for:
+                failure = error
+            else:
+                logger.warn(f"Deferred Sikuli keyword '{name}' failed: {error}")
+        # A failed set-up step explains whatever failed after it.
+        return fatal or failure
+
+    def _multicall(self, server: xmlrpc.client.ServerProxy, batch: list) -> Optional[list]:
+        multicall = xmlrpc.client.MultiCall(server)
+        for name, args, _ in batch:
+            multicall.run_keyword(name, args)
+
+        try:
+            results = multicall().results
+        except xmlrpc.client.Fault:
+            # No system.multicall on this server: remember and send one by one.
+            self._multicall_supported = False
+            return None
+        except (OSError, xmlrpc.client.Error) as err:
+            self._proxy = None
+            return [RuntimeError(f"Connection to remote server broken: {err}")] * len(batch)
+
+        return [
+            RuntimeError(result["faultString"]) if isinstance(result, dict) else result[0]
+            for result in results
+        ]
+
+    def _call(self, server: xmlrpc.client.ServerProxy, name: str, args: list) -> Any:
+        try:
+            return server.run_keyword(name, args)
+        except xmlrpc.client.Fault as err:
+            return RuntimeError(err.faultString)
+        except (OSError, xmlrpc.client.Error) as err:
+            self._proxy = None
+            return RuntimeError(f"Connection to remote server broken: {err}")
+
+    def _apply(self, name: str, response: Any, pending: PendingResult) -> Optional[Exception]:
+        if isinstance(response, Exception):
+            pending._set(None, failed=True)
+            return response
+
+        result = RemoteResult(response)
+        sys.stdout.write(result.output)
+        pending._set(result.return_, failed=result.status != "PASS")
+        if result.status != "PASS":
+            return RemoteError(result.error, result.traceback, result.fatal, result.continuable)
+        return None
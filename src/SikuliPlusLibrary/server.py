@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import socket
+from typing import Optional
+
+from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn
+from SikuliLibrary import SikuliLibrary
+
+from .rpc import CommandChannel
+from .state import BackendState
+
+
+class ServerManager:
+    """Starts the Sikuli Java server once and keeps it healthy.
+
+    The JVM is started on the first suite and reused by the following ones;
+    every suite start only checks that the server still accepts connections
+    and restarts it if it crashed.
+
+    With a fixed ``port``, parallel pabot workers each get their own server on
+    ``port + ${PABOTEXECUTIONPOOLID}``. With ``keep_alive`` the server is left
+    running when the process ends, so the next robot process of the same
+    worker connects to it instead of paying the JVM startup again.
+    """
+
+    def __init__(
+        self,
+        sikuli: SikuliLibrary,
+        rpc: CommandChannel,
+        state: BackendState,
+        port: int = 0,
+        keep_alive: bool = False,
+        connect_timeout: float = 1.0,
+    ) -> None:
+        self.sikuli = sikuli
+        self.rpc = rpc
+        self.state = state
+        self.port = port
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.starts = 0
+        self.restarts = 0
+
+    def ensure_running(self) -> None:
+        if self.sikuli.remote is not None and self.is_alive(self.sikuli.port):
+            return
+
+        if self.sikuli.remote is not None:
+            logger.warn(f"Sikuli server on port {self.sikuli.port} stopped responding, restarting it")
+            self.restarts += 1
+
+        port = self.worker_port()
+        if port and self.keep_alive and self.is_alive(port):
+            # Left running by a previous process of this worker. Its state is unknown.
+            self.sikuli.connect_sikuli_process(port)
+            self.rpc.reset()
+            self.state.invalidate()
+            return
+
+        self.sikuli.start_sikuli_process(port or None)
+        self.starts += 1
+        self.rpc.reset()
+        self.state.reset()
+
+    def stop(self) -> None:
+        # Only a server on a fixed port can be found again by the next process.
+        if (self.keep_alive and self.port) or self.sikuli.remote is None:
+            return
+        try:
+            self.sikuli.run_keyword("stop_remote_server")
+        except Exception as error:
+            # Crashed or already gone: there is nothing left to stop.
+            logger.debug(f"Sikuli server on port {self.sikuli.port} did not answer the stop: {error}")
+        self.sikuli.remote = None
+
+    def worker_port(self) -> int:
+        """Configured port offset by the pabot pool id, or 0 for any free port."""
+        if not self.port:
+            return 0
+        try:
+            pool_id = BuiltIn().get_variable_value("${PABOTEXECUTIONPOOLID}", 0)
+        except Exception:
+            # Robot is not running, e.g. the library is used from Python.
+            pool_id = 0
+        return self.port + int(pool_id or 0)
+
+    def is_alive(self, port: Optional[int]) -> bool:
+        if not port:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", int(port)), timeout=self.connect_timeout):
+                return True
+        except OSError:
+            return False
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .rpc import CommandChannel, PendingResult
+
+
+# Sikuli's own defaults, i.e. the state of a freshly started server.
+DEFAULT_SIMILARITY = 0.7
+DEFAULT_SCREEN = 0
+
+_UNKNOWN = object()
+
+
+class BackendState:
+    """Client-side mirror of the Sikuli server's similarity, ROI and screen.
+
+    Keywords declare the state they need instead of setting it and restoring
+    it afterwards. A state-changing primitive is only deferred when the wanted
+    value differs from the mirrored one, so a run of keywords with the same
+    settings costs no extra calls, and a keyword that needs the defaults back
+    restores them lazily, riding along with its first blocking call.
+    """
+
+    def __init__(self, rpc: CommandChannel) -> None:
+        self.rpc = rpc
+        self._values: Dict[str, Any] = {}
+        self._pending: Dict[str, PendingResult] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Mirror a freshly started server."""
+        self._values = {"similarity": DEFAULT_SIMILARITY, "roi": None, "screen": DEFAULT_SCREEN}
+        self._pending.clear()
+
+    def invalidate(self) -> None:
+        """Forget the mirrored state, e.g. when the server may have been changed behind our back."""
+        self._values = dict.fromkeys(self._values, _UNKNOWN)
+        self._pending.clear()
+
+    def set_similarity(self, similarity: float) -> None:
+        self._change("similarity", float(similarity), "Set Min Similarity", [similarity])
+
+    def set_roi(self, roi: Optional[List[int]]) -> None:
+        if roi is None:
+            self._change("roi", None, "Reset Roi", [])
+        else:
+            coordinates = [int(value) for value in roi]
+            self._change("roi", coordinates, "Set Roi", [coordinates])
+
+    def set_screen(self, screen: int) -> None:
+        self._change("screen", int(screen), "Change Screen Id", [int(screen)])
+
+    def _change(self, key: str, value: Any, keyword: str, args: list) -> None:
+        pending = self._pending.get(key)
+        if pending is not None and pending.failed:
+            # The server never took the last change, so its value is anyone's guess.
+            self._values[key] = _UNKNOWN
+
+        if self._values[key] is not _UNKNOWN and self._values[key] == value:
+            return
+
+        # Fatal: searching with the wrong similarity, ROI or screen must not pass.
+        self._pending[key] = self.rpc.defer(keyword, args, fatal=True)
+        self._values[key] = value
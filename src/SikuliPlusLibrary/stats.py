@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class KeywordRecord:
+    """Timings of one keyword call: total, per phase and time until the first match."""
+
+    __slots__ = ("name", "started", "total", "phases", "counts", "time_to_match", "status")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.time_to_match: Optional[float] = None
+        self.status = "PASS"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "keyword": self.name,
+            "status": self.status,
+            "total": self.total,
+            "time_to_match": self.time_to_match,
+            "phases": dict(self.phases),
+            "counts": dict(self.counts),
+        }
+
+
+class Stats:
+    """Counters and phase timings of the keyword hot path, cheap enough to leave on.
+
+    ``keyword`` opens a record for the calling thread; ``phase``, ``count``
+    and ``matched`` add to it and do nothing outside a keyword. Phases can
+    nest, e.g. ``roi`` includes the ``rpc`` time spent resolving the ROI.
+    Finished records are summed per keyword name for ``snapshot``.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def keyword(self, name: str):
+        if not self.enabled:
+            yield None
+            return
+
+        record = KeywordRecord(name)
+        previous = getattr(self._local, "record", None)
+        self._local.record = record
+        try:
+            yield record
+        except BaseException:
+            record.status = "FAIL"
+            raise
+        finally:
+            record.total = time.perf_counter() - record.started
+            self._local.record = previous
+            self._add(record)
+
+    @contextmanager
+    def phase(self, name: str):
+        record = getattr(self._local, "record", None)
+        if record is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record.phases[name] = record.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name: str, amount: int = 1) -> None:
+        record = getattr(self._local, "record", None)
+        if record is not None:
+            record.counts[name] = record.counts.get(name, 0) + amount
+
+    def matched(self) -> None:
+        """Mark the first match of the current keyword."""
+        record = getattr(self._local, "record", None)
+        if record is not None and record.time_to_match is None:
+            record.time_to_match = time.perf_counter() - record.started
+
+    def _add(self, record: KeywordRecord) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(
+                record.name,
+                {"calls": 0, "failures": 0, "total": 0.0, "max": 0.0, "matches": 0, "time_to_match": 0.0,
+                 "phases": {}, "counts": {}},
+            )
+            totals["calls"] += 1
+            totals["failures"] += record.status != "PASS"
+            totals["total"] += record.total
+            totals["max"] = max(totals["max"], record.total)
+            if record.time_to_match is not None:
+                totals["matches"] += 1
+                totals["time_to_match"] += record.time_to_match
+            for phase, seconds in record.phases.items():
+                totals["phases"][phase] = totals["phases"].get(phase, 0.0) + seconds
+            for counter, amount in record.counts.items():
+                totals["counts"][counter] = totals["counts"].get(counter, 0) + amount
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per keyword name; times are in seconds."""
+        with self._lock:
+            return {
+                name: {**totals, "phases": dict(totals["phases"]), "counts": dict(totals["counts"])}
+                for name, totals in self._totals.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+stats = Stats()